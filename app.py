@@ -1,38 +1,153 @@
 import sys
 import os
+import csv
+import itertools
+import random
+import re
+import time
+
+# Time taken by each stage of startup, as (stage, seconds since this module
+# started loading); printed and saved when the app runs with --startup-report
+STARTUP_STARTED = time.perf_counter()
+startup_times = []
+
+def mark_startup(stage):
+    startup_times.append((stage, time.perf_counter() - STARTUP_STARTED))
+
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QPushButton, QLabel, QTableWidget, 
-                            QTableWidgetItem, QDialog, QLineEdit, QComboBox, 
+                            QTableWidgetItem, QTableView, QDialog, QLineEdit, QComboBox, 
                             QTextEdit, QSpinBox, QMessageBox, QTabWidget,
                             QDateEdit, QCompleter, QFrame, QToolBar,
-                            QFileDialog, QHeaderView, QMenu)
-from PySide6.QtCore import Qt, QDate
-from PySide6.QtGui import QFont, QIcon, QPainter, QPalette, QColor, QAction, QPixmap
-from PySide6.QtCharts import QChart, QChartView, QPieSeries
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, func
+                            QFileDialog, QHeaderView, QMenu, QProgressDialog,
+                            QGridLayout, QStyledItemDelegate)
+from PySide6.QtCore import (Qt, QDate, QAbstractTableModel, QEvent, QIdentityProxyModel, QModelIndex,
+                            QObject, QRunnable, QThreadPool, QTimer, Signal)
+from PySide6.QtGui import (QFont, QIcon, QPainter, QPalette, QColor, QAction, QPixmap,
+                           QStandardItem, QStandardItemModel)
+mark_startup("import PySide6")
+from sqlalchemy import (create_engine, event, cast, or_, text, update, Column, Boolean, Integer, String,
+                        Text, DateTime, ForeignKey, Index, UniqueConstraint, column, func, inspect, table)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime, timezone
-import pandas as pd
+from sqlalchemy.orm import sessionmaker, relationship, aliased
+from sqlalchemy.pool import QueuePool
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from functools import cmp_to_key
+from operator import itemgetter
+mark_startup("import SQLAlchemy")
 
 # Get the user's AppData folder path
 app_data_path = os.path.join(os.getenv('APPDATA'), 'THRUZIM Inventory')
 os.makedirs(app_data_path, exist_ok=True)
 
-# Update database path to use AppData
-DB_PATH = os.path.join(app_data_path, 'inventory.db')
+# Update database path to use AppData, unless INVENTORY_DB_PATH points
+# elsewhere (e.g. a database shared between several machines)
+DB_PATH = os.getenv('INVENTORY_DB_PATH') or os.path.join(app_data_path, 'inventory.db')
 
 # Get the application directory for resources
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 LOGO_PATH = os.path.join(APP_DIR, "thruzim .png")
 
+# SQLite settings applied to every new connection. Each one can be
+# overridden with an environment variable, e.g. INVENTORY_JOURNAL_MODE=DELETE
+DB_PRAGMAS = {
+    # WAL lets readers carry on while another connection writes. It relies
+    # on memory shared by every process using the database, so make_engine
+    # falls back to a rollback journal for a database on a network drive.
+    "journal_mode": "WAL",
+    # In WAL mode NORMAL can lose the last commits on power loss, but never
+    # corrupts the database
+    "synchronous": "NORMAL",
+    # Page cache per connection; negative values are in KiB
+    "cache_size": "-32768",
+    "mmap_size": "268435456",
+    "temp_store": "MEMORY",
+    # How long to wait for another connection's lock before failing, in ms
+    "busy_timeout": "10000",
+}
+
+# Connections kept open for the GUI thread and the worker threads, and how
+# many more may be opened when they are all in use
+POOL_SIZE = 5
+POOL_OVERFLOW = 10
+
+def is_network_path(path):
+    """Whether path is on a network share, where WAL mode can't be used"""
+    path = os.path.abspath(path)
+    if path.startswith("\\\\"):
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+    return False
+
+def make_engine(path, **pragmas):
+    """Create an engine for the database at path with a pool of tuned connections.
+
+    Keyword arguments override DB_PRAGMAS, as do INVENTORY_<PRAGMA>
+    environment variables.
+    """
+    settings = dict(DB_PRAGMAS)
+    if is_network_path(path):
+        settings["journal_mode"] = "DELETE"
+    for name in settings:
+        settings[name] = os.getenv(f"INVENTORY_{name.upper()}", settings[name])
+    settings.update(pragmas)
+
+    # Pooled connections move between the GUI thread and the workers, but
+    # only ever one thread uses a connection at a time
+    engine = create_engine(f"sqlite:///{path}", poolclass=QueuePool, pool_size=POOL_SIZE,
+                           max_overflow=POOL_OVERFLOW,
+                           connect_args={"check_same_thread": False,
+                                         "timeout": int(settings["busy_timeout"]) / 1000})
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+        # pysqlite only begins a transaction at the first write, so reads
+        # made before it aren't isolated; begin_transaction emits BEGIN
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_transaction(connection):
+        # A transaction that is going to write must take the write lock up
+        # front with execution_options(sqlite_begin="BEGIN IMMEDIATE"): in
+        # WAL mode a read transaction that later writes fails at once with
+        # "database is locked", without waiting out the busy timeout, when
+        # another connection committed in between
+        connection.exec_driver_sql(connection.get_execution_options().get("sqlite_begin", "BEGIN"))
+
+    return engine
+
 # Database setup
 Base = declarative_base()
-engine = create_engine(f"sqlite:///{DB_PATH}")
+engine = make_engine(DB_PATH)
 Session = sessionmaker(bind=engine)
-
-# Create all tables if they don't exist
-Base.metadata.create_all(engine)
+# Sessions that write are bound here, so that their transactions take the
+# write lock as they begin: Session(bind=write_engine)
+write_engine = engine.execution_options(sqlite_begin="BEGIN IMMEDIATE")
+
+@contextmanager
+def session_scope():
+    """Session for one unit of work that writes: committed if the block
+    succeeds, rolled back if it raises, and closed either way"""
+    session = Session(bind=write_engine)
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
 
 class Item(Base):
     __tablename__ = 'item'
@@ -49,6 +164,16 @@ class Item(Base):
     status = Column(String(20), default="Active")
     notes = Column(Text)
     movements = relationship("StockMovement", back_populates="item")
+    balances = relationship("StockBalance", back_populates="item", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_item_name", "name"),
+        Index("ix_item_status", "status"),
+        Index("ix_item_date_added", "date_added"),
+        Index("ix_item_project_category", "project_category"),
+        Index("ix_item_quantity", "quantity"),
+        Index("ix_item_storage_location", "storage_location"),
+    )
 
 class StockMovement(Base):
     __tablename__ = 'stock_movement'
@@ -57,13 +182,1790 @@ class StockMovement(Base):
     movement_type = Column(String(20), nullable=False)
     from_location = Column(String(50))
     to_location = Column(String(50))
+    from_project = Column(String(100))
     project_category = Column(String(100))
     quantity = Column(Integer, nullable=False)
     status = Column(String(20))
     date = Column(DateTime, default=datetime.now(timezone.utc))
     notes = Column(Text)
+    # Set on imported movements, which are kept as a record but never
+    # changed any balance, so replaying the ledger skips them
+    history_only = Column(Boolean, nullable=False, default=False, server_default=text("0"))
     item = relationship("Item", back_populates="movements")
 
+    __table_args__ = (
+        Index("ix_stock_movement_item_id_date", "item_id", "date"),
+        Index("ix_stock_movement_status_item_id", "status", "item_id"),
+        Index("ix_stock_movement_date", "date"),
+        Index("ix_stock_movement_movement_type", "movement_type"),
+    )
+
+class StockBalance(Base):
+    """Quantity of an item held at one location for one project.
+
+    The balances are the stock ledger: post_movements moves stock between
+    them, and an item's quantity is the sum of its balances. A missing
+    location or project is stored as an empty string, so that it still
+    takes part in the unique key.
+    """
+    __tablename__ = 'stock_balance'
+    id = Column(Integer, primary_key=True)
+    item_id = Column(Integer, ForeignKey('item.id'), nullable=False)
+    location = Column(String(50), nullable=False, default="")
+    project = Column(String(100), nullable=False, default="")
+    quantity = Column(Integer, nullable=False, default=0)
+    item = relationship("Item", back_populates="balances")
+
+    __table_args__ = (
+        UniqueConstraint("item_id", "location", "project", name="uq_stock_balance_item_location_project"),
+    )
+
+class StockSnapshot(Base):
+    """Checkpoint of the stock ledger, as it stood before the as_of date.
+
+    The snapshot counts every movement dated before as_of, so the stock on
+    any date can be worked out by replaying only the movements between it
+    and the nearest snapshot. last_movement_id is the newest movement when
+    the snapshot was taken, used to space snapshots out.
+    """
+    __tablename__ = 'stock_snapshot'
+    id = Column(Integer, primary_key=True)
+    as_of = Column(DateTime, nullable=False)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_stock_snapshot_as_of", "as_of"),
+    )
+
+class StockSnapshotBalance(Base):
+    __tablename__ = 'stock_snapshot_balance'
+    id = Column(Integer, primary_key=True)
+    snapshot_id = Column(Integer, ForeignKey('stock_snapshot.id'), nullable=False)
+    item_id = Column(Integer, ForeignKey('item.id'), nullable=False)
+    location = Column(String(50), nullable=False, default="")
+    project = Column(String(100), nullable=False, default="")
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("snapshot_id", "item_id", "location", "project",
+                         name="uq_stock_snapshot_balance_snapshot_item_location_project"),
+    )
+
+class DashboardStat(Base):
+    """Row count and total quantity for one value of a dashboard dimension,
+    kept up to date by the triggers added in create_dashboard_stats"""
+    __tablename__ = 'dashboard_stat'
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    items = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+
+# Schema migrations, applied in order by upgrade_database. On an engine from
+# make_engine every pending migration, and the version stamp after each,
+# runs in one BEGIN IMMEDIATE transaction, so if one fails the database is
+# left at the version it started at and the next launch starts over. Keep
+# them safe to re-run all the same (CREATE ... IF NOT EXISTS): on a plain
+# engine, as the benchmarks use, pysqlite commits each DDL statement as it
+# runs.
+def add_lookup_indexes(connection):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_item_name ON item (name)",
+        "CREATE INDEX IF NOT EXISTS ix_item_status ON item (status)",
+        "CREATE INDEX IF NOT EXISTS ix_item_date_added ON item (date_added)",
+        "CREATE INDEX IF NOT EXISTS ix_item_project_category ON item (project_category)",
+        "CREATE INDEX IF NOT EXISTS ix_stock_movement_item_id_date ON stock_movement (item_id, date)",
+        "CREATE INDEX IF NOT EXISTS ix_stock_movement_status_item_id ON stock_movement (status, item_id)",
+        "CREATE INDEX IF NOT EXISTS ix_stock_movement_date ON stock_movement (date)",
+        "CREATE INDEX IF NOT EXISTS ix_stock_movement_movement_type ON stock_movement (movement_type)",
+        "ANALYZE",
+    ]:
+        connection.execute(text(statement))
+
+# Text columns covered by the item_search full-text index
+ITEM_SEARCH_COLUMNS = ["name", "serial_number", "model", "project_category",
+                       "storage_location", "supplier", "description", "notes"]
+
+def create_item_search_index(connection):
+    """Add an FTS5 index over the item's text columns.
+
+    item_search is an external content table: it holds only the index and
+    reads the text back from item. The triggers keep it in step with every
+    write to item, including the bulk inserts done by the importer.
+    """
+    columns = ", ".join(ITEM_SEARCH_COLUMNS)
+    old = ", ".join(f"old.{column}" for column in ITEM_SEARCH_COLUMNS)
+    new = ", ".join(f"new.{column}" for column in ITEM_SEARCH_COLUMNS)
+    for statement in [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5({columns}, "
+        f"content='item', content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS item_search_insert AFTER INSERT ON item BEGIN "
+        f"INSERT INTO item_search (rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS item_search_delete AFTER DELETE ON item BEGIN "
+        f"INSERT INTO item_search (item_search, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS item_search_update AFTER UPDATE OF {columns} ON item BEGIN "
+        f"INSERT INTO item_search (item_search, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO item_search (rowid, {columns}) VALUES (new.id, {new}); END",
+    ]:
+        connection.execute(text(statement))
+    rebuild_item_search_index(connection)
+
+def rebuild_item_search_index(connection):
+    """Re-index every item, e.g. after the item table was edited outside the app"""
+    connection.execute(text("INSERT INTO item_search (item_search) VALUES ('rebuild')"))
+
+# Serial numbers given to the items that transfers used to create
+TRANSFER_SERIAL = re.compile(r"^(.*)-TR\d{14}(?:-\d+)?$")
+
+def create_stock_balances(connection):
+    """Fill the stock_balance ledger from the items.
+
+    Each item's quantity becomes its balance at its own location and
+    project. Transfers used to copy the item under a "-TR<timestamp>"
+    serial number; each copy is folded back into the item it came from,
+    as a balance at the copy's location and project, and the copy's
+    movements are moved over to that item.
+
+    Movements only used to record the project stock went to, so those that
+    took stock out are given the project of the item they were recorded
+    against, which is where the stock was held. This is done before the
+    copies are folded, so a copy's movements keep the copy's project, the
+    one its folded balance is kept under.
+    """
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(stock_movement)"))]
+    if "from_project" not in columns:
+        connection.execute(text("ALTER TABLE stock_movement ADD COLUMN from_project VARCHAR(100)"))
+    connection.execute(text(
+        "UPDATE stock_movement SET from_project = "
+        "(SELECT coalesce(project_category, '') FROM item WHERE item.id = stock_movement.item_id) "
+        "WHERE from_project IS NULL AND movement_type != 'In'"))
+    connection.execute(text("DELETE FROM stock_balance"))
+    connection.execute(text(
+        "INSERT INTO stock_balance (item_id, location, project, quantity) "
+        "SELECT id, coalesce(storage_location, ''), coalesce(project_category, ''), quantity "
+        "FROM item WHERE quantity != 0"))
+
+    copies = connection.execute(text("SELECT id, serial_number FROM item WHERE serial_number LIKE '%-TR%'")).all()
+    # Copies of copies first, so that they reach the original through their parent
+    for copy_id, serial in sorted(copies, key=lambda copy: len(copy[1]), reverse=True):
+        match = TRANSFER_SERIAL.match(serial)
+        origin_id = match and connection.execute(
+            text("SELECT id FROM item WHERE serial_number = :serial"), {"serial": match.group(1)}).scalar()
+        if not origin_id:
+            continue
+        parameters = {"copy": copy_id, "origin": origin_id}
+        for statement in [
+            # WHERE true tells SQLite's parser the ON CONFLICT belongs to the upsert
+            "INSERT INTO stock_balance (item_id, location, project, quantity) "
+            "SELECT :origin, location, project, quantity FROM stock_balance WHERE item_id = :copy AND true "
+            "ON CONFLICT (item_id, location, project) DO UPDATE SET quantity = quantity + excluded.quantity",
+            "DELETE FROM stock_balance WHERE item_id = :copy",
+            "UPDATE item SET quantity = coalesce(quantity, 0) + coalesce((SELECT quantity FROM item WHERE id = :copy), 0) "
+            "WHERE id = :origin",
+            "UPDATE stock_movement SET item_id = :origin WHERE item_id = :copy",
+            "DELETE FROM item WHERE id = :copy",
+        ]:
+            connection.execute(text(statement), parameters)
+
+# Items with this quantity or less count as low on stock. The dashboard_stat
+# triggers have it built in, so changing it needs a new migration that
+# re-runs create_dashboard_stats.
+LOW_STOCK_LEVEL = 5
+
+# The dashboard_stat dimensions counted over each table, as SQL giving the
+# key of a row
+DASHBOARD_DIMENSIONS = {
+    "item": [
+        ("status", "coalesce({row}.status, '')"),
+        ("stock", f"CASE WHEN coalesce({{row}}.quantity, 0) <= {LOW_STOCK_LEVEL} THEN 'low' ELSE 'ok' END"),
+    ],
+    "stock_balance": [
+        ("location", "{row}.location"),
+        ("project", "{row}.project"),
+    ],
+}
+
+def create_dashboard_stats(connection):
+    """Keep dashboard_stat up to date with triggers on item and stock_balance.
+
+    Each write to those tables moves its row's count and quantity between
+    the dimension keys, so the dashboard reads a few dozen totals instead
+    of aggregating the tables, and the totals follow every writer,
+    including the importer and edits made outside the app.
+    """
+    def count(dimension, key, row, sign):
+        return (f"INSERT INTO dashboard_stat (dimension, key, items, quantity) "
+                f"VALUES ('{dimension}', {key.format(row=row)}, {sign}1, {sign}coalesce({row}.quantity, 0)) "
+                f"ON CONFLICT (dimension, key) DO UPDATE SET "
+                f"items = items + excluded.items, quantity = quantity + excluded.quantity; ")
+
+    for table_name, dimensions in DASHBOARD_DIMENSIONS.items():
+        added = "".join(count(dimension, key, "new", "") for dimension, key in dimensions)
+        removed = "".join(count(dimension, key, "old", "-") for dimension, key in dimensions)
+        watched = "quantity, status" if table_name == "item" else "quantity, location, project"
+        for statement in [
+            f"DROP TRIGGER IF EXISTS {table_name}_stat_insert",
+            f"DROP TRIGGER IF EXISTS {table_name}_stat_delete",
+            f"DROP TRIGGER IF EXISTS {table_name}_stat_update",
+            f"CREATE TRIGGER {table_name}_stat_insert AFTER INSERT ON {table_name} BEGIN {added}END",
+            f"CREATE TRIGGER {table_name}_stat_delete AFTER DELETE ON {table_name} BEGIN {removed}END",
+            f"CREATE TRIGGER {table_name}_stat_update AFTER UPDATE OF {watched} ON {table_name} "
+            f"BEGIN {removed}{added}END",
+        ]:
+            connection.execute(text(statement))
+    rebuild_dashboard_stats(connection)
+
+def rebuild_dashboard_stats(connection):
+    """Recount dashboard_stat from the tables"""
+    connection.execute(text("DELETE FROM dashboard_stat"))
+    for table_name, dimensions in DASHBOARD_DIMENSIONS.items():
+        for dimension, key in dimensions:
+            connection.execute(text(
+                f"INSERT INTO dashboard_stat (dimension, key, items, quantity) "
+                f"SELECT '{dimension}', {key.format(row=table_name)}, count(*), coalesce(sum(quantity), 0) "
+                f"FROM {table_name} GROUP BY 2"))
+
+def add_sort_indexes(connection):
+    """Index the other item columns the tables can be sorted by, so a sorted
+    window is read in index order instead of sorting the whole table"""
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_item_quantity ON item (quantity)",
+        "CREATE INDEX IF NOT EXISTS ix_item_storage_location ON item (storage_location)",
+        "ANALYZE",
+    ]:
+        connection.execute(text(statement))
+
+def add_history_only_flag(connection):
+    """Add the flag that keeps imported movements out of ledger replays"""
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(stock_movement)"))]
+    if "history_only" not in columns:
+        connection.execute(text("ALTER TABLE stock_movement ADD COLUMN history_only BOOLEAN NOT NULL DEFAULT 0"))
+
+MIGRATIONS = [
+    (1, add_lookup_indexes),
+    (2, create_item_search_index),
+    (3, create_stock_balances),
+    (4, create_dashboard_stats),
+    (5, add_sort_indexes),
+    (6, add_history_only_flag),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def upgrade_database(engine):
+    """Create missing tables and apply pending migrations.
+
+    The schema version is kept in SQLite's PRAGMA user_version, which is 0
+    for new databases and those created before migrations existed. A
+    database already at SCHEMA_VERSION is left alone, so a normal start
+    costs one PRAGMA instead of checking every table.
+    """
+    with engine.connect() as connection:
+        if connection.execute(text("PRAGMA user_version")).scalar() >= SCHEMA_VERSION:
+            return
+    # Take the write lock before reading the version again, so that when
+    # two machines start on a new shared database only one upgrades it
+    with engine.connect().execution_options(sqlite_begin="BEGIN IMMEDIATE") as connection, connection.begin():
+        version = connection.execute(text("PRAGMA user_version")).scalar()
+        if version >= SCHEMA_VERSION:
+            return
+        Base.metadata.create_all(connection)
+        for target, migrate in MIGRATIONS:
+            if target > version:
+                migrate(connection)
+                connection.execute(text(f"PRAGMA user_version = {target}"))
+
+class QueryCounter:
+    """Counts the SQL statements an engine runs inside a with block.
+
+        with QueryCounter(engine) as counter:
+            window.export_data()
+        assert counter.count <= 3
+
+    Each statement is also kept in counter.statements for inspection.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def record(self, connection, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self.record)
+        return False
+
+class ChangeNotifier(QObject):
+    """Broadcasts the rows touched by each committed transaction.
+
+    The payload maps a table name to a (changed ids, deleted ids) pair, so
+    views can patch just those rows instead of reloading everything.
+    """
+    committed = Signal(dict)
+
+change_notifier = ChangeNotifier()
+
+def record_changes(session, table, changed=(), deleted=()):
+    """Queue ids written outside the ORM unit of work for the next commit"""
+    pending = session.info.setdefault("pending_changes", {})
+    changed_ids, deleted_ids = pending.setdefault(table, (set(), set()))
+    changed_ids.update(changed)
+    deleted_ids.update(deleted)
+    changed_ids.difference_update(deleted_ids)
+
+@event.listens_for(Session, "after_flush")
+def collect_flushed_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        record_changes(session, obj.__tablename__, changed=[obj.id])
+    for obj in session.deleted:
+        record_changes(session, obj.__tablename__, deleted=[obj.id])
+
+@event.listens_for(Session, "after_flush")
+def keep_home_balances(session, flush_context):
+    """Quantity added or edited on the item itself is held at the item's own
+    location and project; movements go through post_movements instead.
+
+    When the item's location or project is edited, the balance held there
+    moves with it. An edit that would leave a balance below zero, because
+    the rest of the item's stock is held elsewhere, raises ValueError.
+    """
+    deltas = {}
+    moves = []
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Item):
+            attrs = inspect(obj).attrs
+            added, _, deleted = attrs.quantity.history
+            delta = sum(value or 0 for value in added) - sum(value or 0 for value in deleted)
+            # The home the item had before this flush, where its balance is
+            home = balance_key(obj.id, *[attrs[name].history.deleted[0] if attrs[name].history.deleted
+                                         else getattr(obj, name)
+                                         for name in ("storage_location", "project_category")])
+            if delta:
+                deltas[home] = deltas.get(home, 0) + delta
+            new_home = balance_key(obj.id, obj.storage_location, obj.project_category)
+            if new_home != home:
+                moves.append((home, new_home))
+    if not deltas and not moves:
+        return
+    add_to_balances(session, deltas)
+
+    def at(key):
+        item_id, location, project = key
+        return session.query(StockBalance).filter(StockBalance.item_id == item_id,
+                                                  StockBalance.location == location,
+                                                  StockBalance.project == project)
+
+    for home, new_home in moves:
+        quantity = at(home).with_entities(StockBalance.quantity).scalar()
+        if quantity is not None:
+            at(home).delete(synchronize_session=False)
+            add_to_balances(session, {new_home: quantity})
+    # Only balances that went down, or that a balance moved to, can be short
+    for key in {key for key, delta in deltas.items() if delta < 0} | {new_home for _, new_home in moves}:
+        if (at(key).with_entities(StockBalance.quantity).scalar() or 0) < 0:
+            _, location, project = key
+            raise ValueError(f"Insufficient quantity at {location or 'no location'} for {project or 'no project'}, "
+                             f"as the rest of the item's stock is held at other locations or projects")
+
+@event.listens_for(Session, "after_commit")
+def emit_committed_changes(session):
+    changes = session.info.pop("pending_changes", None)
+    if changes:
+        change_notifier.committed.emit(changes)
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_changes(session):
+    session.info.pop("pending_changes", None)
+
+MOVEMENT_TYPES = ["In", "Out", "Transferred"]
+
+class PostingError(Exception):
+    """Raised when stock movements can't be posted, e.g. for lack of stock.
+
+    errors holds a (line number, message) pair for each rejected line,
+    numbered from 1 in the order the lines were given.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        if len(errors) == 1:
+            message = errors[0][1]
+        else:
+            message = "\n".join(f"Line {line}: {error}" for line, error in errors)
+        super().__init__(message)
+
+# How often posting tries again when another writer holds the lock past
+# the busy timeout, and the delay before the first retry in seconds
+POST_ATTEMPTS = 5
+POST_RETRY_DELAY = 0.05
+
+def post_movement(movement_data, attempts=POST_ATTEMPTS):
+    """Record one stock movement and apply it to its item; returns its id"""
+    return post_movements([movement_data], attempts)[0]
+
+def post_movements(lines, attempts=POST_ATTEMPTS):
+    """Record stock movements and apply them to their items in one transaction.
+
+    Each line is a dict as returned by StockMovementDialog.get_movement_data.
+    Either every line is posted or, if any line is rejected, none is and
+    PostingError lists the rejected lines. "In" adds stock to the item's
+    balance at the destination location and project, "Out" takes it from
+    the balance at the source, and "Transferred" moves it from one balance
+    to the other. The transaction starts with BEGIN IMMEDIATE, so it holds
+    the write lock from the start, and each item and balance gets a single
+    conditional UPDATE for the net change of all its lines, so concurrent
+    posts can neither oversell stock nor overwrite each other's quantity.
+    Returns the new movements' ids, in line order.
+    """
+    errors = []
+    for line, movement_data in enumerate(lines, 1):
+        if not movement_data['item_id']:
+            errors.append((line, "Item not found, select it from the list"))
+        elif movement_data['movement_type'] not in MOVEMENT_TYPES:
+            errors.append((line, "Type must be one of " + ", ".join(MOVEMENT_TYPES)))
+        elif not isinstance(movement_data['quantity'], int) or movement_data['quantity'] < 1:
+            errors.append((line, "Quantity must be a whole number above zero"))
+    if errors:
+        raise PostingError(errors)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            with session_scope() as session:
+                return apply_movements(session, lines)
+        except OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts:
+                raise
+            time.sleep(POST_RETRY_DELAY * 2 ** (attempt - 1))
+
+def balance_key(item_id, location, project):
+    """The stock_balance unique key for an item at a location and project"""
+    return item_id, (location or "").strip(), (project or "").strip()
+
+def add_to_balances(session, deltas, balances=StockBalance.__table__, **key):
+    """Add each quantity in deltas, keyed by balance_key, to its balance,
+    creating the balances that are new, in one executemany.
+
+    balances may be another table of balances, such as a snapshot's, with
+    key giving the rest of its unique key, e.g. snapshot_id=1.
+    """
+    if not deltas:
+        return
+    insert = sqlite_insert(balances)
+    session.execute(insert.on_conflict_do_update(
+        index_elements=list(key) + ["item_id", "location", "project"],
+        set_={"quantity": balances.c.quantity + insert.excluded.quantity}),
+        [dict(key, item_id=item_id, location=location, project=project, quantity=quantity)
+         for (item_id, location, project), quantity in deltas.items()])
+
+def movement_deltas(movements):
+    """Net change of each balance, keyed by balance_key, made by movements.
+
+    Each movement is an (item_id, movement_type, from_location, from_project,
+    to_location, to_project, quantity) row, as selected by LEDGER_COLUMNS.
+    """
+    deltas = {}
+    for item_id, movement_type, from_location, from_project, to_location, to_project, quantity in movements:
+        if movement_type != 'In':
+            source = balance_key(item_id, from_location, from_project)
+            deltas[source] = deltas.get(source, 0) - quantity
+        if movement_type != 'Out':
+            target = balance_key(item_id, to_location, to_project)
+            deltas[target] = deltas.get(target, 0) + quantity
+    return deltas
+
+def movement_row(movement_data):
+    """A movement dict, as taken by post_movements, as a movement_deltas row"""
+    return (movement_data['item_id'], movement_data['movement_type'], movement_data['from_location'],
+            movement_data['from_project'], movement_data['to_location'], movement_data['to_project'],
+            movement_data['quantity'])
+
+def apply_movements(session, lines):
+    # Net change of each balance, and of each item's total quantity, over
+    # all the lines. A transfer moves stock between two balances of the
+    # same item and leaves its total as it is.
+    balances = movement_deltas(map(movement_row, lines))
+    totals = {}
+    damaged = set()
+    for movement_data in lines:
+        item_id, quantity = movement_data['item_id'], movement_data['quantity']
+        totals[item_id] = totals.get(item_id, 0) + {'In': quantity, 'Out': -quantity}.get(
+            movement_data['movement_type'], 0)
+        # Update item status if marked as damaged
+        if movement_data['status'] == "Damaged":
+            damaged.add(item_id)
+
+    found = {item_id for item_id, in session.query(Item.id).filter(Item.id.in_(totals))}
+    errors = [(line, "Item not found, select it from the list")
+              for line, movement_data in enumerate(lines, 1) if movement_data['item_id'] not in found]
+
+    # Outgoing and transferred stock must be available where it is taken from
+    for (item_id, location, project), delta in balances.items():
+        if delta >= 0 or item_id not in found:
+            continue
+        updated = session.execute(
+            update(StockBalance)
+            .where(StockBalance.item_id == item_id, StockBalance.location == location,
+                   StockBalance.project == project, StockBalance.quantity + delta >= 0)
+            .values(quantity=StockBalance.quantity + delta).execution_options(synchronize_session=False))
+        if not updated.rowcount:
+            # Blame the lines taking stock out of this balance
+            message = f"Insufficient quantity at {location or 'no location'} for {project or 'no project'}"
+            errors += [(line, message) for line, movement_data in enumerate(lines, 1)
+                       if movement_data['movement_type'] != 'In'
+                       and balance_key(item_id, location, project) == balance_key(
+                           movement_data['item_id'], movement_data['from_location'], movement_data['from_project'])]
+    for item_id, delta in totals.items():
+        if item_id not in found:
+            continue
+        values = {'quantity': Item.quantity + delta}
+        if item_id in damaged:
+            values['status'] = "Damaged"
+        updated = session.execute(update(Item).where(Item.id == item_id, Item.quantity + delta >= 0)
+                                  .values(**values).execution_options(synchronize_session=False))
+        if not updated.rowcount:
+            # Only reached if the balances don't add up to the item's quantity
+            blamed = {line for line, _ in errors}
+            errors += [(line, "Insufficient quantity available")
+                       for line, movement_data in enumerate(lines, 1)
+                       if movement_data['item_id'] == item_id and movement_data['movement_type'] == 'Out'
+                       and line not in blamed]
+    if errors:
+        raise PostingError(sorted(errors))
+    add_to_balances(session, {key: delta for key, delta in balances.items() if delta > 0})
+    session.query(StockBalance).filter(StockBalance.item_id.in_(totals), StockBalance.quantity == 0) \
+        .delete(synchronize_session=False)
+    record_changes(session, "item", changed=totals)
+
+    # Create movement records
+    records = [{
+        'item_id': movement_data['item_id'],
+        'movement_type': movement_data['movement_type'],
+        'from_location': movement_data['from_location'],
+        'to_location': movement_data['to_location'],
+        'from_project': movement_data['from_project'],
+        'project_category': movement_data['to_project'],
+        'quantity': movement_data['quantity'],
+        'status': movement_data['status'],
+        'date': movement_data['date'],
+        'notes': movement_data['notes'],
+    } for movement_data in lines]
+    last_id = session.query(func.max(StockMovement.id)).scalar() or 0
+    session.execute(StockMovement.__table__.insert(), records)
+    # New rows of an INTEGER PRIMARY KEY table get ids above the old max
+    movement_ids = list(range(last_id + 1, last_id + len(records) + 1))
+    record_changes(session, "stock_movement", changed=movement_ids)
+
+    # Backdated lines belong in the snapshots taken after their date
+    for snapshot_id, as_of in session.query(StockSnapshot.id, StockSnapshot.as_of).filter(
+            StockSnapshot.as_of > min(as_datetime(movement_data['date']) for movement_data in lines)):
+        add_to_balances(session, movement_deltas(
+            movement_row(movement_data) for movement_data in lines if as_datetime(movement_data['date']) < as_of),
+            StockSnapshotBalance.__table__, snapshot_id=snapshot_id)
+    last_snapshot = session.query(func.max(StockSnapshot.last_movement_id)).scalar() or 0
+    if movement_ids[-1] - last_snapshot >= SNAPSHOT_INTERVAL:
+        take_stock_snapshot(session)
+    return movement_ids
+
+# Movements posted between two automatic snapshots of the stock ledger
+SNAPSHOT_INTERVAL = 10000
+
+# A movement's item, source and destination balances and quantity
+LEDGER_COLUMNS = [StockMovement.item_id, StockMovement.movement_type, StockMovement.from_location,
+                  StockMovement.from_project, StockMovement.to_location, StockMovement.project_category,
+                  StockMovement.quantity]
+
+def as_datetime(value):
+    """A movement date, which the dialogs give as a date, as a datetime"""
+    return value if isinstance(value, datetime) else datetime.combine(value, datetime.min.time())
+
+def take_stock_snapshot(session, as_of=None):
+    """Save the current balances as a snapshot as of as_of, by default now.
+
+    Movements dated on or after as_of are already in the balances, so they
+    are taken back out of the snapshot. Returns the snapshot's id.
+    """
+    as_of = as_of or datetime.now()
+    last_movement_id = session.query(func.max(StockMovement.id)).scalar() or 0
+    snapshot_id = session.execute(StockSnapshot.__table__.insert().values(
+        as_of=as_of, last_movement_id=last_movement_id)).inserted_primary_key[0]
+    session.execute(text(
+        "INSERT INTO stock_snapshot_balance (snapshot_id, item_id, location, project, quantity) "
+        "SELECT :snapshot, item_id, location, project, quantity FROM stock_balance WHERE quantity != 0"),
+        {"snapshot": snapshot_id})
+    later = movement_deltas(session.query(*LEDGER_COLUMNS).filter(StockMovement.date >= as_of,
+                                                                  StockMovement.history_only.is_(False)))
+    add_to_balances(session, {key: -delta for key, delta in later.items()},
+                    StockSnapshotBalance.__table__, snapshot_id=snapshot_id)
+    return snapshot_id
+
+def stock_as_of(session, as_of, item_id=None):
+    """Balances counting only the movements dated before as_of, as a
+    {(item_id, location, project): quantity} dict, for one item or all.
+
+    Starts from the latest snapshot before as_of and replays the movements
+    since; without one, starts from the earliest snapshot after as_of, or
+    from the current balances, and takes back the movements in between.
+    Quantities changed by editing an item rather than by a movement are
+    only seen from the first snapshot taken after the edit, and imported
+    movements, which are history only, are left out.
+    """
+    def balances(model, *criteria):
+        query = session.query(model.item_id, model.location, model.project, model.quantity).filter(*criteria)
+        if item_id is not None:
+            query = query.filter(model.item_id == item_id)
+        return {(row_item, location, project): quantity for row_item, location, project, quantity in query}
+
+    movements = session.query(*LEDGER_COLUMNS).filter(StockMovement.history_only.is_(False))
+    if item_id is not None:
+        movements = movements.filter(StockMovement.item_id == item_id)
+    before = session.query(StockSnapshot).filter(StockSnapshot.as_of <= as_of) \
+        .order_by(StockSnapshot.as_of.desc()).first()
+    if before is not None:
+        stock = balances(StockSnapshotBalance, StockSnapshotBalance.snapshot_id == before.id)
+        sign = 1
+        movements = movements.filter(StockMovement.date >= before.as_of, StockMovement.date < as_of)
+    else:
+        after = session.query(StockSnapshot).filter(StockSnapshot.as_of > as_of) \
+            .order_by(StockSnapshot.as_of).first()
+        sign = -1
+        movements = movements.filter(StockMovement.date >= as_of)
+        if after is not None:
+            stock = balances(StockSnapshotBalance, StockSnapshotBalance.snapshot_id == after.id)
+            movements = movements.filter(StockMovement.date < after.as_of)
+        else:
+            stock = balances(StockBalance)
+    for key, delta in movement_deltas(movements).items():
+        stock[key] = stock.get(key, 0) + sign * delta
+    return {key: quantity for key, quantity in stock.items() if quantity}
+
+def query_dashboard_stats(session):
+    """dashboard_stat as {dimension: {key: (rows, quantity)}}, leaving out
+    keys no row has any more"""
+    stats = {dimension: {} for dimensions in DASHBOARD_DIMENSIONS.values() for dimension, _ in dimensions}
+    for dimension, key, items, quantity in session.query(
+            DashboardStat.dimension, DashboardStat.key, DashboardStat.items, DashboardStat.quantity):
+        if items:
+            stats.setdefault(dimension, {})[key] = (items, quantity)
+    return stats
+
+def query_item_balances(session, item_id):
+    """(location, project, quantity) of each balance an item holds stock in"""
+    return (session.query(StockBalance.location, StockBalance.project, StockBalance.quantity)
+            .filter(StockBalance.item_id == item_id, StockBalance.quantity != 0)
+            .order_by(StockBalance.location, StockBalance.project).all())
+
+class Cancelled(Exception):
+    """Raised inside a worker job once its worker has been cancelled"""
+
+class WorkerSignals(QObject):
+    progress = Signal(int, int)  # done, total (0 when unknown)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+class Worker(QRunnable):
+    """Runs a job on the global thread pool with its own database session.
+
+    The job is called as job(session, worker) and its return value is
+    delivered through signals.finished on the GUI thread. Long jobs should
+    call worker.report(done, total) regularly: it emits progress and raises
+    Cancelled once cancel() has been called. Jobs that write should pass
+    write=True, so that each of their transactions takes the write lock.
+    """
+    # Workers still running, kept alive until their result is delivered
+    active = set()
+
+    def __init__(self, job, write=False):
+        super().__init__()
+        self.job = job
+        self.write = write
+        self.signals = WorkerSignals()
+        self.cancelled = False
+        for signal in (self.signals.finished, self.signals.failed, self.signals.cancelled):
+            signal.connect(lambda *args: Worker.active.discard(self))
+
+    def start(self):
+        Worker.active.add(self)
+        QThreadPool.globalInstance().start(self)
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, done, total=0):
+        if self.cancelled:
+            raise Cancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        session = Session(bind=write_engine) if self.write else Session()
+        try:
+            if self.cancelled:
+                raise Cancelled()
+            result = self.job(session, self)
+        except Cancelled:
+            session.rollback()
+            self.signals.cancelled.emit()
+        except Exception as e:
+            session.rollback()
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            session.close()
+
+# Columns shown in the item and movement tables, primary key first
+ITEM_HEADERS = ["Name", "Serial Number", "Project Name", "Quantity", "Location", "Description", "Date"]
+ITEM_COLUMNS = [Item.id, Item.name, Item.serial_number, Item.project_category,
+                Item.quantity, Item.storage_location, Item.description, Item.date_added]
+
+MOVEMENT_HEADERS = ["Date", "Item", "Serial Number", "Type", "From", "To",
+                    "Project Name", "Quantity", "Status", "Comments"]
+MOVEMENT_COLUMNS = [StockMovement.id, StockMovement.date, Item.name, Item.serial_number,
+                    StockMovement.movement_type, StockMovement.from_location,
+                    StockMovement.to_location, StockMovement.project_category,
+                    StockMovement.quantity, StockMovement.status, StockMovement.notes]
+
+item_search = table("item_search", column("rowid"), column("rank"))
+
+def item_match_expression(search_text, field=None):
+    """Turn what the user typed into an FTS5 query.
+
+    Each word is quoted, so punctuation in serial numbers is taken
+    literally, and matched as a prefix of a token. field limits the match
+    to one of ITEM_SEARCH_COLUMNS. Returns None when there is nothing to
+    match.
+    """
+    words = ['"{}"*'.format(word.replace('"', '""')) for word in search_text.split()]
+    if not words:
+        return None
+    expression = " ".join(words)
+    return f"{field} : ({expression})" if field else expression
+
+def search_items(session, columns, search_text, field=None, before=None):
+    """Query columns of the items matching search_text, newest first.
+
+    Results are ordered by descending id so they can be paged with a
+    keyset: pass the id of the last row already shown as before to get the
+    next page. The full-text index yields matches in rowid order, so a
+    page reads no more matches than it returns.
+    """
+    query = session.query(*columns)
+    expression = item_match_expression(search_text, field)
+    key = Item.id
+    if expression is not None:
+        key = item_search.c.rowid
+        query = (query.join(item_search, key == Item.id)
+                 .filter(text("item_search MATCH :expression").bindparams(expression=expression)))
+    if before is not None:
+        query = query.filter(key < before)
+    return query.order_by(key.desc())
+
+# Full-text index column searched by each "Search by" choice of the search dialog
+SEARCH_FIELDS = {"All Fields": None, "Name": "name", "Project Name": "project_category",
+                 "Serial Number": "serial_number"}
+
+# Rows the search dialog reads per page
+SEARCH_PAGE_SIZE = 100
+
+def query_damaged_items(session):
+    """Damaged items with the movement that first marked each one damaged.
+
+    Yields tuples of the item's export columns followed by the movement's
+    id, date and notes (None when no damaging movement was recorded), all in
+    one query rather than one movement lookup per item.
+    """
+    first_damage = (session.query(StockMovement.item_id, func.min(StockMovement.id).label("movement_id"))
+                    .filter(StockMovement.status == "Damaged")
+                    .group_by(StockMovement.item_id)
+                    .subquery())
+    damage = aliased(StockMovement)
+    return (session.query(Item.name, Item.serial_number, Item.project_category, Item.quantity,
+                          Item.storage_location, Item.description, Item.date_added, Item.notes,
+                          damage.id, damage.date, damage.notes)
+            .filter(Item.status == "Damaged")
+            .outerjoin(first_damage, first_damage.c.item_id == Item.id)
+            .outerjoin(damage, damage.id == first_damage.c.movement_id)
+            .order_by(Item.id))
+
+EXPORT_BATCH_SIZE = 1000
+# Extra rows sampled across a sheet larger than one batch to size its columns
+EXPORT_WIDTH_SAMPLE = 2000
+
+def format_date(value):
+    return value.strftime("%Y-%m-%d") if value else None
+
+def format_item_row(row):
+    return row[:6] + (format_date(row[6]),) + row[7:]
+
+def format_movement_row(row):
+    return (format_date(row[0]),) + row[1:]
+
+def format_damaged_row(row):
+    (name, serial_number, project, quantity, location, description, date_added, notes,
+     movement_id, date_damaged, damage_notes) = row
+    return (name, serial_number, project, quantity, location, description, format_date(date_added),
+            format_date(date_damaged) if movement_id else "N/A",
+            damage_notes if movement_id else "N/A",
+            notes)
+
+# Sheets written by an export: sheet name, CSV file suffix, headers, query,
+# the key column its rows are sampled by, row formatter and whether the
+# sheet is written when it has no rows
+EXPORT_SHEETS = [
+    ("Inventory Items", "_items",
+     ["Name", "Serial Number", "Project Name", "Quantity", "Location", "Description",
+      "Date Added", "Status", "Notes"],
+     lambda session: session.query(
+         Item.name, Item.serial_number, Item.project_category, Item.quantity,
+         Item.storage_location, Item.description, Item.date_added, Item.status, Item.notes
+     ).order_by(Item.id),
+     Item.id, format_item_row, True),
+    ("Stock Movement", "_movements", MOVEMENT_HEADERS,
+     # The movements join their item up front instead of lazy-loading it per row
+     lambda session: (session.query(*MOVEMENT_COLUMNS[1:])
+                      .select_from(StockMovement).join(Item, StockMovement.item)
+                      .order_by(StockMovement.id)),
+     StockMovement.id, format_movement_row, True),
+    ("Damaged Items", "_damaged",
+     ["Name", "Serial Number", "Project Name", "Quantity", "Location", "Description",
+      "Date Added", "Date Damaged", "Damage Notes", "Item Notes"],
+     query_damaged_items, Item.id, format_damaged_row, False),
+]
+
+def iter_export_batches(query, format_row, batch_size=EXPORT_BATCH_SIZE):
+    """Stream a query as lists of formatted rows without loading it all"""
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(format_row(tuple(row)))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def column_widths(headers, rows):
+    """Excel column widths that fit the headers and the given rows"""
+    widths = []
+    for header, values in itertools.zip_longest(headers, zip(*rows), fillvalue=()):
+        lengths = map(len, map(str, (value for value in values if value is not None)))
+        widths.append(max(len(header), max(lengths, default=0)) + 2)
+    return widths
+
+def export_xlsx(session, file_name, progress=None):
+    """Write every export sheet to an xlsx workbook.
+
+    progress, if given, is called as progress(rows written, total rows)
+    after each batch; raising from it abandons the export.
+    """
+    total = sum(build_query(session).count() for _, _, _, build_query, _, _, _ in EXPORT_SHEETS) if progress else 0
+    done = 0
+    # openpyxl takes a while to import, so it is only loaded when needed
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    # Write-only workbooks stream rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+    for sheet_name, _, headers, build_query, key, format_row, always in EXPORT_SHEETS:
+        batches = iter_export_batches(build_query(session), format_row)
+        first_batch = next(batches, [])
+        if not first_batch and not always:
+            continue
+        worksheet = workbook.create_sheet(sheet_name)
+
+        # Column widths have to be set before any row is written, so size
+        # them from the first batch plus a random sample of the rest, picked
+        # by key so that sampling doesn't read the whole sheet
+        sample = first_batch
+        if len(first_batch) == EXPORT_BATCH_SIZE:
+            low, high = session.query(func.min(key), func.max(key)).one()
+            keys = random.sample(range(low, high + 1), min(EXPORT_WIDTH_SAMPLE, high - low + 1))
+            sample = sample + [format_row(tuple(row)) for row in build_query(session).filter(key.in_(keys))]
+        for index, width in enumerate(column_widths(headers, sample)):
+            worksheet.column_dimensions[get_column_letter(index + 1)].width = width
+
+        worksheet.append(headers)
+        for batch in itertools.chain([first_batch], batches):
+            for row in batch:
+                worksheet.append(row)
+            done += len(batch)
+            if progress:
+                progress(done, total)
+    workbook.save(file_name)
+
+def export_csv(session, file_name, progress=None):
+    """Write each export sheet to its own CSV file next to file_name.
+
+    progress works as for export_xlsx; files already written are removed
+    if the export is abandoned.
+    """
+    total = sum(build_query(session).count() for _, _, _, build_query, _, _, _ in EXPORT_SHEETS) if progress else 0
+    done = 0
+    written = []
+    base_name = os.path.splitext(file_name)[0]
+    try:
+        for _, suffix, headers, build_query, _, format_row, always in EXPORT_SHEETS:
+            batches = iter_export_batches(build_query(session), format_row)
+            first_batch = next(batches, [])
+            if not first_batch and not always:
+                continue
+            written.append(f"{base_name}{suffix}.csv")
+            with open(written[-1], "w", newline="", encoding="utf-8") as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(headers)
+                for batch in itertools.chain([first_batch], batches):
+                    writer.writerows(batch)
+                    done += len(batch)
+                    if progress:
+                        progress(done, total)
+    except BaseException:
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+IMPORT_BATCH_SIZE = 500
+
+# Spreadsheet headers accepted by the import, lower-cased, mapped to model
+# attributes. The export's own headers are included so an export can be
+# imported into another database.
+ITEM_IMPORT_HEADERS = {
+    "name": "name", "model": "model", "serial number": "serial_number",
+    "project name": "project_category", "quantity": "quantity", "supplier": "supplier",
+    "location": "storage_location", "description": "description",
+    "date added": "date_added", "date": "date_added", "status": "status", "notes": "notes",
+}
+MOVEMENT_IMPORT_HEADERS = {
+    "date": "date", "item": None, "serial number": "serial_number", "type": "movement_type",
+    "from": "from_location", "to": "to_location", "project name": "project_category",
+    "quantity": "quantity", "status": "status", "comments": "notes", "notes": "notes",
+}
+class ImportReport:
+    """Outcome of an import: rows read and inserted, per-row errors, timing"""
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = {"item": 0, "stock_movement": 0}
+        self.errors = []  # (sheet, row number, message)
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"Read {self.rows_read} rows in {self.elapsed:.1f}s ({self.rows_per_second:.0f} rows/s).\n"
+                f"Imported {self.inserted['item']} items and {self.inserted['stock_movement']} movements.\n"
+                f"{len(self.errors)} rows were rejected.")
+
+    def write_errors(self, file_name):
+        with open(file_name, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Sheet", "Row", "Error"])
+            writer.writerows(self.errors)
+
+def iter_import_sheets(file_name):
+    """Yield (sheet name, header row, row count or 0, rows) for a spreadsheet.
+
+    Rows are streamed as (row number, values) pairs; xlsx files are opened
+    read-only so they are never loaded whole.
+    """
+    if file_name.lower().endswith(".xlsx"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_name, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                rows = worksheet.iter_rows(values_only=True)
+                headers = next(rows, None)
+                if headers:
+                    yield (worksheet.title, headers, max((worksheet.max_row or 1) - 1, 0),
+                           enumerate(rows, start=2))
+        finally:
+            workbook.close()
+    else:
+        with open(file_name, newline="", encoding="utf-8-sig") as csv_file:
+            rows = csv.reader(csv_file)
+            headers = next(rows, None)
+            if headers:
+                yield os.path.basename(file_name), headers, 0, enumerate(rows, start=2)
+
+def convert_import_value(column, value):
+    """Convert a spreadsheet cell to a value for column, or raise ValueError"""
+    if isinstance(value, str):
+        value = value.strip()
+    if value is None or value == "":
+        return None
+    if isinstance(column.type, Integer):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{column.name} must be a whole number")
+    if isinstance(column.type, DateTime):
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError(f"{column.name} must be a date like 2025-04-02")
+    value = str(value)
+    if column.type.length and len(value) > column.type.length:
+        raise ValueError(f"{column.name} is longer than {column.type.length} characters")
+    return value
+
+def parse_import_row(table, fields, values, defaults):
+    """Map a row's values onto table columns, applying defaults"""
+    record = dict(defaults)
+    for field, value in zip(fields, values):
+        if field is not None and field in table.c:
+            value = convert_import_value(table.c[field], value)
+            if value is not None:
+                record[field] = value
+        elif field is not None:
+            record[field] = str(value).strip() if value is not None else None
+    return record
+
+def import_spreadsheet(session, file_name, progress=None):
+    """Bulk-load items and stock movements from an xlsx or CSV file.
+
+    A sheet is read as movements when it has a Type column and as items
+    otherwise. Every row is validated against the model columns; rows whose
+    serial number is already in the database or earlier in the file are
+    rejected. Valid rows are inserted with executemany in transactions of
+    IMPORT_BATCH_SIZE rows; an item's quantity is entered in the ledger at
+    its location and project. Movements are linked to items by serial number
+    and are recorded as history only, without changing item quantities.
+    progress is called as progress(rows read, total rows or 0).
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    seen_serials = set()
+
+    def insert_items(batch):
+        serials = [record["serial_number"] for _, record in batch if record["serial_number"]]
+        existing = {serial for serial, in session.query(Item.serial_number)
+                    .filter(Item.serial_number.in_(serials))} if serials else set()
+        records = []
+        for row_number, record in batch:
+            if record["serial_number"] in existing:
+                report.errors.append((sheet_name, row_number,
+                                      f"Serial number {record['serial_number']} already exists"))
+            else:
+                records.append(record)
+        return Item, records
+
+    def insert_movements(batch):
+        serials = {record["item_serial"] for _, record in batch}
+        item_ids = dict(session.query(Item.serial_number, Item.id)
+                        .filter(Item.serial_number.in_(serials))) if serials else {}
+        records = []
+        for row_number, record in batch:
+            item_id = item_ids.get(record.pop("item_serial"))
+            if item_id is None:
+                report.errors.append((sheet_name, row_number, "No item with this serial number"))
+            else:
+                record["item_id"] = item_id
+                record["history_only"] = True
+                records.append(record)
+        return StockMovement, records
+
+    def flush(batch, prepare):
+        model, records = prepare(batch)
+        if not records:
+            return
+        last_id = session.query(func.max(model.id)).scalar() or 0
+        session.execute(model.__table__.insert(), records)
+        # New rows of an INTEGER PRIMARY KEY table get ids above the old max
+        ids = range(last_id + 1, last_id + len(records) + 1)
+        record_changes(session, model.__tablename__, changed=ids)
+        balances = [dict(zip(("item_id", "location", "project"),
+                             balance_key(item_id, record.get("storage_location"), record.get("project_category"))),
+                         quantity=record["quantity"])
+                    for item_id, record in zip(ids, records) if model is Item and record.get("quantity")]
+        if balances:
+            session.execute(StockBalance.__table__.insert(), balances)
+        session.commit()
+        report.inserted[model.__tablename__] += len(records)
+
+    total = 0
+    for sheet_name, headers, row_count, rows in iter_import_sheets(file_name):
+        total += row_count
+        labels = [str(header).strip().lower() if header is not None else None for header in headers]
+        is_movements = "type" in labels or "movement_type" in labels
+        known = MOVEMENT_IMPORT_HEADERS if is_movements else ITEM_IMPORT_HEADERS
+        table = StockMovement.__table__ if is_movements else Item.__table__
+        unknown = [header for header, label in zip(headers, labels)
+                   if label is not None and label not in known and label not in table.c]
+        if unknown:
+            report.errors.append((sheet_name, 1, "Unrecognised columns: " + ", ".join(map(str, unknown))))
+            continue
+        fields = [known.get(label, label) if label is not None else None for label in labels]
+        if is_movements:
+            # Keep the serial number for the item lookup under its own key
+            fields = ["item_serial" if field == "serial_number" else field for field in fields]
+            defaults = {column: None for column in ["movement_type", "from_location", "to_location",
+                                                    "project_category", "quantity", "status", "notes"]}
+            defaults["item_serial"] = None
+        else:
+            defaults = {column: None for column in ["name", "model", "serial_number", "description",
+                                                    "project_category", "supplier", "storage_location",
+                                                    "notes"]}
+            defaults.update(quantity=0, status="Active")
+
+        batch = []
+        for row_number, values in rows:
+            if not any(value not in (None, "") for value in values):
+                continue
+            report.rows_read += 1
+            try:
+                record = parse_import_row(table, fields, values, defaults)
+                if is_movements:
+                    record.setdefault("date", datetime.now())
+                    if not record["item_serial"]:
+                        raise ValueError("Serial Number is required")
+                    if record["movement_type"] not in MOVEMENT_TYPES:
+                        raise ValueError("Type must be one of " + ", ".join(MOVEMENT_TYPES))
+                    if not record["quantity"] or record["quantity"] < 1:
+                        raise ValueError("Quantity must be at least 1")
+                else:
+                    record.setdefault("date_added", datetime.now())
+                    if not record["name"]:
+                        raise ValueError("Name is required")
+                    if record["quantity"] < 0:
+                        raise ValueError("Quantity cannot be negative")
+                    serial = record["serial_number"]
+                    if serial in seen_serials:
+                        raise ValueError(f"Serial number {serial} appears earlier in the file")
+                    if serial:
+                        seen_serials.add(serial)
+            except ValueError as e:
+                report.errors.append((sheet_name, row_number, str(e)))
+                continue
+
+            batch.append((row_number, record))
+            if len(batch) == IMPORT_BATCH_SIZE:
+                flush(batch, insert_movements if is_movements else insert_items)
+                batch = []
+                if progress:
+                    progress(report.rows_read, total)
+        if batch:
+            flush(batch, insert_movements if is_movements else insert_items)
+        if progress:
+            progress(report.rows_read, total)
+
+    report.elapsed = time.perf_counter() - started
+    return report
+
+class ItemCompletionIndex:
+    """The item labels offered by the movement dialog's completer, in memory.
+
+    Every item is read once, on the thread pool, and the index is then
+    patched from each commit, so opening the dialog runs no query. The
+    words of each label are kept in a sorted list of (word, id) pairs, so
+    search() finds word prefixes by bisection. It only scans every label,
+    for substring and then fuzzy matches, when the prefix matches don't
+    fill the result cap.
+    """
+    LIMIT = 50
+    # Above this many changed items the whole index is read again
+    PATCH_LIMIT = 500
+
+    def __init__(self):
+        self.labels = {}
+        self.words = []
+        # All labels, lowered, as scanned by scan(); None until needed
+        self.text = None
+        self.loaded = False
+        # Ids of items changed while the index is being read, or None
+        self.pending = None
+
+    @staticmethod
+    def read(session, ids=None):
+        query = session.query(Item.id, Item.name, Item.serial_number,
+                              Item.project_category, Item.storage_location)
+        if ids is not None:
+            query = query.filter(Item.id.in_(ids))
+        return [(item_id, f"{name} - {serial_number} - {project} - {location}")
+                for item_id, name, serial_number, project, location in query]
+
+    @staticmethod
+    def label_words(label):
+        return set(label.lower().split()) - {"-"}
+
+    def load(self):
+        """Read every item on the thread pool; fill() swaps the result in"""
+        if self.pending is not None:
+            return
+        self.pending = set()
+        worker = Worker(lambda session, worker: self.read(session))
+        worker.signals.finished.connect(self.fill)
+        worker.signals.failed.connect(self.load_failed)
+        worker.start()
+
+    def fill(self, labels):
+        pending, self.pending = self.pending, None
+        self.labels = dict(labels)
+        self.text = None
+        self.words = sorted((word, item_id) for item_id, label in labels for word in self.label_words(label))
+        self.loaded = True
+        if pending:
+            self.refresh(pending)
+
+    def load_failed(self, message):
+        self.pending = None
+
+    def apply_changes(self, changes):
+        if "item" not in changes:
+            return
+        changed, deleted = changes["item"]
+        ids = set(changed) | set(deleted)
+        if self.pending is not None:
+            # The read in progress may predate these changes
+            self.pending |= ids
+        elif len(ids) > self.PATCH_LIMIT:
+            self.load()
+        elif self.loaded:
+            self.refresh(ids)
+
+    def refresh(self, ids):
+        """Re-read the labels of the given items, dropping deleted ones"""
+        session = Session()
+        try:
+            fresh = dict(self.read(session, ids))
+        finally:
+            session.close()
+        self.text = None
+        for item_id in ids:
+            label = self.labels.pop(item_id, None)
+            if label is not None:
+                for word in self.label_words(label):
+                    del self.words[bisect_left(self.words, (word, item_id))]
+            label = fresh.get(item_id)
+            if label is not None:
+                self.labels[item_id] = label
+                for word in self.label_words(label):
+                    insort(self.words, (word, item_id))
+
+    def search(self, search_text, limit=LIMIT):
+        """Return up to limit (id, label) pairs matching search_text, best first.
+
+        Labels starting with the text come first, then labels with a word
+        starting with each typed word, then labels containing every typed
+        word. Only when nothing matches so far are labels containing the
+        typed letters in order offered, to forgive typos.
+        """
+        search_text = search_text.strip().lower()
+        typed = search_text.split()
+        if not typed:
+            return []
+
+        # Walk the words starting with the typed word that has the fewest
+        # of them; the shortest completions come first
+        ranges = [(bisect_left(self.words, (part,)), bisect_left(self.words, (part + "\uffff",)))
+                  for part in typed]
+        first, last = min(ranges, key=lambda bounds: bounds[1] - bounds[0])
+        found = {}
+        for word, item_id in itertools.islice(self.words, first, last):
+            if len(found) >= limit:
+                break
+            if item_id in found:
+                continue
+            label = self.labels[item_id]
+            words = self.label_words(label)
+            if all(any(word.startswith(part) for word in words) for part in typed):
+                found[item_id] = 0 if label.lower().startswith(search_text) else 1
+        matches = sorted(found, key=lambda item_id: found[item_id])
+
+        if len(matches) < limit:
+            longest = max(typed, key=len)
+            matches += self.scan(re.escape(longest), limit - len(matches), set(matches),
+                                 lambda label: all(part in label for part in typed))
+        if not matches:
+            letters = "".join(typed)
+            pattern = "[^\n]*?".join(map(re.escape, letters))
+            matches += self.scan(pattern, limit - len(matches), set(matches))
+        return [(item_id, self.labels[item_id]) for item_id in matches]
+
+    def scan(self, pattern, limit, skip, accept=None):
+        """Find labels matching a regular expression in one pass over all of them.
+
+        The lowered labels are joined into one newline separated string,
+        rebuilt after changes, so the scan runs inside the regex engine.
+        """
+        if self.text is None:
+            self.text_ids = list(self.labels)
+            lowered = [self.labels[item_id].lower() for item_id in self.text_ids]
+            self.text_offsets = list(itertools.accumulate((len(label) + 1 for label in lowered[:-1]), initial=0))
+            self.text = "\n".join(lowered)
+        matches = []
+        for match in re.finditer(pattern, self.text):
+            if len(matches) >= limit:
+                break
+            line = bisect_right(self.text_offsets, match.start()) - 1
+            item_id = self.text_ids[line]
+            if item_id in skip:
+                continue
+            skip.add(item_id)
+            if accept is None or accept(self.labels[item_id].lower()):
+                matches.append(item_id)
+        return matches
+
+item_completions = ItemCompletionIndex()
+
+# How long typing in a search box must pause before the table is re-queried
+FILTER_DELAY_MS = 250
+
+# Rows of the shared items model shown on the dashboard
+RECENT_ITEMS_LIMIT = 100
+
+# The dashboard chart's choices, with the dashboard_stat dimension of each,
+# and the most slices it shows before grouping the rest as "Other"
+DASHBOARD_CHARTS = {"Location": "location", "Project": "project", "Status": "status"}
+DASHBOARD_CHART_SLICES = 8
+
+class LazyQueryModel(QAbstractTableModel):
+    """Read-only table model that pages rows in from the database on demand.
+
+    Only the rows the view has scrolled to are held in memory, as plain
+    tuples. Qt calls canFetchMore/fetchMore as the user nears the end of the
+    loaded rows, and each call reads the next window with LIMIT/OFFSET.
+    """
+    BATCH_SIZE = 256
+    # Above this many changed ids a full reload is cheaper than patching
+    PATCH_LIMIT = 500
+    # Loaded keys per query when rows are read again by key, under SQLite's
+    # limit on bound parameters
+    LOOKUP_CHUNK = 10000
+
+    def __init__(self, headers, columns, order, prepare=None, watch=None, search=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        # The first column must be the primary key; it is kept in each row
+        # but not displayed.
+        self.columns = columns
+        # List of (column position, descending) pairs
+        self.order = order
+        # Optional callable adding joins/filters to the base query
+        self.prepare = prepare
+        # Maps table names to the column identifying affected rows; changes
+        # to any other table are ignored
+        self.key_table = columns[0].expression.table.name
+        self.watch = watch or {self.key_table: columns[0]}
+        # Positions of the columns the search text is matched against
+        self.search_columns = search or range(1, len(columns))
+        self.search_text = ""
+        self.rows = []
+        self.exhausted = False
+        # Worker reading the next window, and a counter that invalidates
+        # windows still being read when the model is reloaded
+        self.fetching = None
+        self.generation = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.UserRole:
+            # Every cell of a row carries the row's primary key
+            return self.rows[index.row()][0]
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        value = self.rows[index.row()][index.column() + 1]
+        if value is None:
+            return ""
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d")
+        return str(value)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def sort_spec(self):
+        # Tie-break on the primary key so every row has a stable position
+        return self.order + [(0, bool(self.order) and self.order[0][1])]
+
+    def build_query(self, session):
+        query = session.query(*self.columns)
+        if self.prepare:
+            query = self.prepare(query)
+        if self.search_text:
+            pattern = "%" + self.search_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            # Dates and numbers are matched on their text form, as displayed
+            query = query.filter(or_(*[self.search_text_of(self.columns[position]).ilike(pattern, escape="\\")
+                                       for position in self.search_columns]))
+        return query.order_by(*[self.columns[position].desc() if descending else self.columns[position]
+                                for position, descending in self.sort_spec()])
+
+    @staticmethod
+    def search_text_of(column):
+        """SQL for a column's text as data() displays it"""
+        if isinstance(column.type, String):
+            return column
+        if isinstance(column.type, DateTime):
+            # Stored as "YYYY-MM-DD HH:MM:SS.ffffff" but shown as the date only
+            return func.strftime("%Y-%m-%d", column)
+        return cast(column, String)
+
+    def compare_rows(self, a, b):
+        """Compare two rows the way SQLite orders them (NULLs sort lowest)"""
+        for position, descending in self.sort_spec():
+            x, y = a[position], b[position]
+            if x == y:
+                continue
+            if x is None:
+                result = -1
+            elif y is None:
+                result = 1
+            else:
+                result = -1 if x < y else 1
+            return -result if descending else result
+        return 0
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and self.fetching is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Read the next window on the thread pool; append_batch adds it"""
+        if parent.isValid() or self.exhausted or self.fetching is not None:
+            return
+        generation, offset = self.generation, len(self.rows)
+
+        def fetch(session, worker):
+            query = self.build_query(session).offset(offset).limit(self.BATCH_SIZE)
+            return generation, offset, [tuple(row) for row in query]
+
+        self.fetching = Worker(fetch)
+        self.fetching.signals.finished.connect(self.append_batch)
+        self.fetching.signals.failed.connect(self.fetch_failed)
+        self.fetching.start()
+
+    def append_batch(self, result):
+        generation, offset, batch = result
+        if generation != self.generation:
+            # A reload superseded this window; the reload fetches its own
+            return
+        self.fetching = None
+        if offset != len(self.rows):
+            # Rows were patched in or out while reading, so the window no
+            # longer lines up with the loaded rows; read it again
+            self.fetchMore()
+            return
+
+        if len(batch) < self.BATCH_SIZE:
+            self.exhausted = True
+        if batch:
+            self.beginInsertRows(QModelIndex(), offset, offset + len(batch) - 1)
+            self.rows.extend(batch)
+            self.endInsertRows()
+
+    def fetch_failed(self, message):
+        self.fetching = None
+        self.exhausted = True
+        QMessageBox.critical(self.parent(), "Error", f"Error loading data: {message}")
+
+    def apply_changes(self, changes):
+        """Insert, update or remove just the rows affected by a commit.
+
+        The loaded rows always mirror the first len(rows) rows of the query,
+        so a row that sorts past the loaded window is left for fetchMore.
+        """
+        changed = {table: changes[table][0] for table in self.watch if table in changes}
+        deleted = set(changes[self.key_table][1]) if self.key_table in changes else set()
+        if sum(map(len, changed.values())) + len(deleted) > self.PATCH_LIMIT:
+            self.reload()
+            return
+
+        fresh = {}
+        if any(changed.values()):
+            session = Session()
+            try:
+                keys = changed.get(self.key_table)
+                if keys:
+                    fresh.update((row[0], tuple(row)) for row in
+                                 self.build_query(session).filter(self.columns[0].in_(keys)))
+                related = [self.watch[table].in_(ids) for table, ids in changed.items()
+                           if table != self.key_table and ids]
+                # A change elsewhere (an item, for movements) can touch any
+                # number of rows, so only the loaded ones are read again
+                for start in range(0, len(self.rows) if related else 0, self.LOOKUP_CHUNK):
+                    loaded = [row[0] for row in self.rows[start:start + self.LOOKUP_CHUNK]]
+                    fresh.update((row[0], tuple(row)) for row in self.build_query(session).order_by(None)
+                                 .filter(self.columns[0].in_(loaded), or_(*related)))
+            finally:
+                session.close()
+
+        sort_key = cmp_to_key(self.compare_rows)
+        # Positions of the loaded rows by key, rebuilt after rows move
+        positions = None
+        for key in deleted | set(changed.get(self.key_table, ())) | set(fresh):
+            row = fresh.get(key)
+            if positions is None:
+                positions = {loaded[0]: i for i, loaded in enumerate(self.rows)}
+            position = positions.get(key)
+            if position is not None:
+                if row == self.rows[position]:
+                    continue
+                # Update in place when the row keeps its position
+                if (row is not None
+                        and (position == 0 or sort_key(self.rows[position - 1]) < sort_key(row))
+                        and (position == len(self.rows) - 1 or sort_key(row) < sort_key(self.rows[position + 1]))):
+                    self.rows[position] = row
+                    self.dataChanged.emit(self.index(position, 0),
+                                          self.index(position, self.columnCount() - 1))
+                    continue
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self.rows[position]
+                self.endRemoveRows()
+                positions = None
+            if row is None:
+                continue
+
+            low, high = 0, len(self.rows)
+            while low < high:
+                middle = (low + high) // 2
+                if sort_key(self.rows[middle]) < sort_key(row):
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < len(self.rows) or self.exhausted:
+                self.beginInsertRows(QModelIndex(), low, low)
+                self.rows.insert(low, row)
+                self.endInsertRows()
+                positions = None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Order the rows by a displayed column.
+
+        When every row is already loaded they are sorted in memory, which
+        keeps the view's selection; otherwise the first window is read
+        again in the new order, which an index on the column keeps cheap.
+        """
+        new_order = [(column + 1, order == Qt.SortOrder.DescendingOrder)] if column >= 0 else []
+        if new_order == self.order:
+            return
+        if not self.exhausted or self.fetching is not None:
+            self.reload(new_order)
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        keys = [self.rows[index.row()][0] for index in persistent]
+        self.order = new_order
+        position, descending = self.sort_spec()[0]
+        try:
+            self.rows.sort(key=itemgetter(position, 0), reverse=descending)
+        except TypeError:
+            # The column has NULLs, which sort lowest, as in SQLite
+            self.rows.sort(key=lambda row: (row[position] is not None, row[position], row[0]),
+                           reverse=descending)
+        if persistent:
+            rows = {row[0]: number for number, row in enumerate(self.rows)}
+            self.changePersistentIndexList(persistent, [self.index(rows[key], index.column())
+                                                        for key, index in zip(keys, persistent)])
+        self.layoutChanged.emit()
+
+    def set_search(self, search_text):
+        """Show only the rows with a searched column containing search_text"""
+        search_text = search_text.strip()
+        if search_text != self.search_text:
+            self.search_text = search_text
+            self.reload()
+
+    def reload(self, order=None):
+        """Drop the loaded rows and fetch the first window again"""
+        self.release()
+        if order is not None:
+            self.order = order
+        self.exhausted = False
+        self.fetchMore()
+
+    def release(self):
+        """Drop the loaded rows and read no more until the next reload"""
+        self.beginResetModel()
+        if self.fetching is not None:
+            self.fetching.cancel()
+            self.fetching = None
+        self.generation += 1
+        self.rows = []
+        self.exhausted = True
+        self.endResetModel()
+
+class RecentRowsModel(QAbstractTableModel):
+    """The first limit rows of a LazyQueryModel in the order it started
+    with, for a second view sharing its rows.
+
+    While the source keeps that order, these are its first rows, and no
+    more than limit of them are read into it. Once the source is sorted
+    some other way, they come from a window of their own, limit rows long,
+    in the starting order. Sorting reorders just these rows, and any change
+    to them rebuilds them, which costs no more than limit rows whatever the
+    source holds.
+    """
+    def __init__(self, source, limit, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.limit = limit
+        self.order = list(source.order)
+        self.window = LazyQueryModel(source.headers, source.columns, self.order, prepare=source.prepare,
+                                     watch=source.watch, parent=self)
+        self.window.BATCH_SIZE = limit
+        self.window.release()
+        # The model the rows are read from: the source or the window
+        self.rows_model = source
+        self.sort_column = -1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        # Row of rows_model shown in each row
+        self.source_rows = []
+        for model in [source, self.window]:
+            model.modelReset.connect(lambda model=model: self.rows_changed(model, 0))
+            model.layoutChanged.connect(lambda *args, model=model: self.rows_changed(model, 0))
+            model.rowsInserted.connect(lambda parent, first, last, model=model: self.rows_changed(model, first))
+            model.rowsRemoved.connect(lambda parent, first, last, model=model: self.rows_changed(model, first))
+            model.dataChanged.connect(lambda top_left, *args, model=model: self.rows_changed(model, top_left.row()))
+        self.refresh()
+
+    def rows_changed(self, model, first):
+        rows_model = self.source if self.source.order == self.order else self.window
+        if rows_model is not self.rows_model:
+            self.rows_model = rows_model
+            if rows_model is self.window:
+                self.window.reload()
+            else:
+                self.window.release()
+            self.refresh()
+        elif model is rows_model and first < self.limit:
+            self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        rows = self.rows_model.rows
+        self.source_rows = list(range(min(self.limit, len(rows))))
+        if self.sort_column >= 0:
+            position = self.sort_column + 1
+            # NULLs sort lowest, as in the source
+            self.source_rows.sort(key=lambda row: (rows[row][position] is not None, rows[row][position]),
+                                  reverse=self.sort_order == Qt.SortOrder.DescendingOrder)
+        self.endResetModel()
+
+    def reload(self):
+        """Read the window again, if the rows come from it"""
+        if self.rows_model is self.window:
+            self.window.reload()
+
+    def apply_changes(self, changes):
+        if self.rows_model is self.window:
+            self.window.apply_changes(changes)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column, self.sort_order = column, order
+        self.refresh()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.source_rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return self.source.columnCount(parent)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.rows_model.data(self.rows_model.index(self.source_rows[index.row()], index.column()), role)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        return self.source.headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self.rows_model.rowCount() < self.limit and self.rows_model.canFetchMore(parent)
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.rows_model.fetchMore(parent)
+
+class RowHeightSizer(QObject):
+    """Sizes a table's rows to fit their wrapped text, measuring only the
+    rows in view.
+
+    Text heights come from the table's font metrics and are cached by text
+    and column width, so re-measuring after a scroll, a column resize or a
+    change to the model mostly reads the cache. Rows that have never been
+    scrolled into view keep the default height.
+    """
+    MIN_HEIGHT = 30
+    PADDING = 10
+    CACHE_LIMIT = 20000
+
+    def __init__(self, table):
+        super().__init__(table)
+        self.table = table
+        self.heights = {}
+        table.verticalHeader().setDefaultSectionSize(self.MIN_HEIGHT)
+        # Measure once the current burst of signals is over
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.measure)
+        table.verticalScrollBar().valueChanged.connect(self.schedule)
+        table.horizontalHeader().sectionResized.connect(self.schedule)
+        model = table.model()
+        for signal in [model.rowsInserted, model.rowsRemoved, model.dataChanged,
+                       model.modelReset, model.layoutChanged]:
+            signal.connect(self.schedule)
+        table.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Resize:
+            self.schedule()
+        return False
+
+    def schedule(self, *args):
+        self.timer.start(0)
+
+    def text_height(self, text, width):
+        key = (text, width)
+        height = self.heights.get(key)
+        if height is None:
+            if len(self.heights) >= self.CACHE_LIMIT:
+                self.heights.clear()
+            height = self.table.fontMetrics().boundingRect(
+                0, 0, max(width - self.PADDING, 1), 0, Qt.TextFlag.TextWordWrap, text).height()
+            self.heights[key] = height
+        return height
+
+    def row_height(self, row):
+        model = self.table.model()
+        height = self.MIN_HEIGHT
+        for section in range(model.columnCount()):
+            text = model.index(row, section).data()
+            if text and not self.table.isColumnHidden(section):
+                height = max(height, self.text_height(str(text), self.table.columnWidth(section)) + self.PADDING)
+        return height
+
+    def measure(self):
+        """Size the rows from the top of the viewport down to its bottom"""
+        header = self.table.verticalHeader()
+        row = self.table.rowAt(0)
+        if row < 0:
+            return
+        rows = self.table.model().rowCount()
+        bottom = self.table.viewport().height()
+        position = header.sectionViewportPosition(row)
+        while row < rows and position < bottom:
+            height = self.row_height(row)
+            if header.sectionSize(row) != height:
+                header.resizeSection(row, height)
+            position += height
+            row += 1
+
 class AddItemDialog(QDialog):
     def __init__(self, parent=None, item=None):
         super().__init__(parent)
@@ -196,6 +2098,35 @@ class AddItemDialog(QDialog):
             'notes': self.notes_input.toPlainText()
         }
 
+class ItemCompleter(QCompleter):
+    """Completer for an item line edit, filled from item_completions as the
+    user types.
+
+    Each entry carries the item id, so the selection never depends on the
+    text: item_id is the id of the entry picked last, and is cleared as
+    soon as the text is edited by hand.
+    """
+    def __init__(self, line_edit):
+        super().__init__(line_edit)
+        self.item_model = QStandardItemModel(self)
+        self.setModel(self.item_model)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.item_id = None
+        line_edit.setCompleter(self)
+        self.activated[QModelIndex].connect(self.handle_item_activated)
+        line_edit.textEdited.connect(self.update_item_completions)
+
+    def handle_item_activated(self, index):
+        self.item_id = index.data(Qt.ItemDataRole.UserRole)
+
+    def update_item_completions(self, text):
+        self.item_id = None
+        self.item_model.clear()
+        for item_id, label in item_completions.search(text):
+            entry = QStandardItem(label)
+            entry.setData(item_id, Qt.ItemDataRole.UserRole)
+            self.item_model.appendRow(entry)
+
 class StockMovementDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -311,16 +2242,7 @@ class StockMovementDialog(QDialog):
         self.setup_item_autocomplete()
 
     def setup_item_autocomplete(self):
-        session = Session()
-        items = session.query(Item).all()
-        item_list = []
-        for item in items:
-            item_list.append(f"{item.name} - {item.serial_number} - {item.project_category} - {item.storage_location}")
-        session.close()
-
-        completer = QCompleter(item_list)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.item_input.setCompleter(completer)
+        self.item_completer = ItemCompleter(self.item_input)
 
         # Connect signal to handle item selection
         self.item_input.textChanged.connect(self.handle_item_selection)
@@ -334,7 +2256,7 @@ class StockMovementDialog(QDialog):
 
     def get_movement_data(self):
         return {
-            'item_name': self.item_input.text().split(" - ")[0] if " - " in self.item_input.text() else self.item_input.text(),
+            'item_id': self.item_completer.item_id,
             'movement_type': self.type_input.currentText(),
             'from_project': self.from_project_input.text(),
             'to_project': self.to_project_input.text(),
@@ -346,6 +2268,183 @@ class StockMovementDialog(QDialog):
             'notes': self.notes_input.toPlainText()
         }
 
+class ItemCompleterDelegate(QStyledItemDelegate):
+    """Edits a grid's item cells with an ItemCompleter, storing the picked
+    item's id in the cell under Qt.UserRole"""
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.item_completer = ItemCompleter(editor)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data() or "")
+        editor.item_completer.item_id = index.data(Qt.ItemDataRole.UserRole)
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text())
+        model.setData(index, editor.item_completer.item_id, Qt.ItemDataRole.UserRole)
+
+class BatchMovementDialog(QDialog):
+    """Grid for recording many movements that share a type, route and date,
+    such as the contents of one delivery, in a single transaction"""
+    # Empty rows added at a time
+    ROWS = 10
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Record Batch Movement")
+        self.setModal(True)
+        self.resize(900, 700)
+        self.posted = 0
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setSpacing(15)
+
+        # Fields shared by every line
+        shared_layout = QGridLayout()
+        self.type_input = QComboBox()
+        self.type_input.addItems(MOVEMENT_TYPES)
+        self.from_project_input = QLineEdit()
+        self.to_project_input = QLineEdit()
+        self.from_input = QComboBox()
+        self.from_input.addItems(["Stores", "Data Office", "Container", "Field Work"])
+        self.to_input = QComboBox()
+        self.to_input.addItems(["Stores", "Data Office", "Container", "Field Work"])
+        self.status_input = QComboBox()
+        self.status_input.addItems(["Active", "Inactive", "Damaged"])
+        self.date_input = QDateEdit()
+        self.date_input.setDate(QDate.currentDate())
+        for position, (label, widget) in enumerate([
+                ("Movement Type:", self.type_input), ("Date:", self.date_input),
+                ("From Project:", self.from_project_input), ("To Project:", self.to_project_input),
+                ("From Location:", self.from_input), ("To Location:", self.to_input),
+                ("Status:", self.status_input)]):
+            row, column = divmod(position, 2)
+            shared_layout.addWidget(QLabel(label), row, column * 2)
+            shared_layout.addWidget(widget, row, column * 2 + 1)
+        layout.addLayout(shared_layout)
+
+        # One line per item; items can be picked from the completer, or
+        # typed or pasted as serial numbers
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Item or Serial Number", "Quantity", "Notes"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.table.setItemDelegateForColumn(0, ItemCompleterDelegate(self.table))
+        self.add_rows()
+        layout.addWidget(self.table)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+        add_rows_button = QPushButton("Add Rows")
+        add_rows_button.clicked.connect(lambda: self.add_rows())
+        paste_button = QPushButton("Paste")
+        paste_button.setToolTip("Paste lines of serial number and quantity, separated by a tab or comma")
+        paste_button.clicked.connect(self.paste_lines)
+        save_button = QPushButton("Save")
+        save_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(add_rows_button)
+        button_layout.addWidget(paste_button)
+        button_layout.addStretch()
+        button_layout.addWidget(save_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def add_rows(self, count=ROWS):
+        first = self.table.rowCount()
+        self.table.setRowCount(first + count)
+        for row in range(first, first + count):
+            self.table.setItem(row, 0, QTableWidgetItem(""))
+            quantity = QTableWidgetItem()
+            quantity.setData(Qt.ItemDataRole.EditRole, 1)
+            self.table.setItem(row, 1, quantity)
+            self.table.setItem(row, 2, QTableWidgetItem(""))
+
+    def paste_lines(self):
+        """Fill empty rows from the clipboard, one "serial, quantity" per line"""
+        lines = [line for line in QApplication.clipboard().text().splitlines() if line.strip()]
+        rows = [row for row in range(self.table.rowCount()) if not self.table.item(row, 0).text().strip()]
+        if len(rows) < len(lines):
+            first = self.table.rowCount()
+            self.add_rows(len(lines) - len(rows))
+            rows += range(first, self.table.rowCount())
+        for row, line in zip(rows, lines):
+            fields = [field.strip() for field in (line.split("\t") if "\t" in line else line.split(","))]
+            self.table.item(row, 0).setText(fields[0])
+            self.table.item(row, 0).setData(Qt.ItemDataRole.UserRole, None)
+            if len(fields) > 1 and fields[1].isdigit():
+                self.table.item(row, 1).setData(Qt.ItemDataRole.EditRole, int(fields[1]))
+            if len(fields) > 2:
+                self.table.item(row, 2).setText(fields[2])
+
+    def get_movement_lines(self):
+        """The movement data of each filled-in row, and the row of each line"""
+        rows, lines = [], []
+        for row in range(self.table.rowCount()):
+            item_cell = self.table.item(row, 0)
+            if not item_cell.text().strip():
+                continue
+            rows.append(row)
+            lines.append({
+                'item_id': item_cell.data(Qt.ItemDataRole.UserRole),
+                'movement_type': self.type_input.currentText(),
+                'from_project': self.from_project_input.text(),
+                'to_project': self.to_project_input.text(),
+                'from_location': self.from_input.currentText(),
+                'to_location': self.to_input.currentText(),
+                'quantity': self.table.item(row, 1).data(Qt.ItemDataRole.EditRole),
+                'status': self.status_input.currentText(),
+                'date': self.date_input.date().toPython(),
+                'notes': self.table.item(row, 2).text()
+            })
+
+        # Rows typed or pasted rather than picked are looked up by serial number
+        serials = {self.table.item(row, 0).text().strip(): line
+                   for row, line in zip(rows, lines) if line['item_id'] is None}
+        if serials:
+            session = Session()
+            try:
+                item_ids = dict(session.query(Item.serial_number, Item.id)
+                                .filter(Item.serial_number.in_(list(serials))))
+            finally:
+                session.close()
+            for row, line in zip(rows, lines):
+                if line['item_id'] is None:
+                    line['item_id'] = item_ids.get(self.table.item(row, 0).text().strip())
+        return rows, lines
+
+    def mark_errors(self, rows, errors):
+        for row in range(self.table.rowCount()):
+            self.table.item(row, 0).setBackground(QColor("white"))
+            self.table.item(row, 0).setToolTip("")
+        for line, message in errors:
+            self.table.item(rows[line - 1], 0).setBackground(QColor("#f8d7da"))
+            self.table.item(rows[line - 1], 0).setToolTip(message)
+
+    def accept(self):
+        rows, lines = self.get_movement_lines()
+        if not lines:
+            QMessageBox.warning(self, "Warning", "Enter at least one item.")
+            return
+        try:
+            post_movements(lines)
+        except PostingError as e:
+            self.mark_errors(rows, e.errors)
+            details = "\n".join(f"Row {rows[line - 1] + 1}: {message}" for line, message in e.errors)
+            QMessageBox.critical(self, "Error", f"No movements were recorded.\n\n{details}")
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error recording movements: {str(e)}")
+            return
+        self.posted = len(lines)
+        super().accept()
+
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -445,9 +2544,46 @@ class MainWindow(QMainWindow):
         login_dialog = LoginDialog(self)
         if login_dialog.exec() != QDialog.DialogCode.Accepted:
             sys.exit()
-            
+        mark_startup("log in")
+
         self.setup_ui()
-        
+        mark_startup("build main window")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.started:
+            self.started = True
+            mark_startup("first paint")
+            # Let this paint reach the screen before doing anything slower
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Load the data and the dashboard chart, after the first paint"""
+        self.load_data()
+        self.setup_dashboard_chart()
+        if "--startup-report" in sys.argv[1:]:
+            self.report_startup()
+
+    def report_startup(self):
+        # Report once the first window of items has arrived
+        if self.items_model.fetching is not None:
+            QTimer.singleShot(10, self.report_startup)
+            return
+        mark_startup("first rows loaded")
+        report = ["Startup times (ms)", f"{'stage':<24}{'took':>10}{'elapsed':>10}"]
+        previous = 0
+        for stage, elapsed in startup_times:
+            report.append(f"{stage:<24}{(elapsed - previous) * 1000:>10.1f}{elapsed * 1000:>10.1f}")
+            previous = elapsed
+        report = "\n".join(report)
+        print(report, file=sys.stderr)
+        # The packaged app has no console, so keep a copy next to the database
+        try:
+            with open(os.path.join(app_data_path, "startup-report.txt"), "w", encoding="utf-8") as report_file:
+                report_file.write(report + "\n")
+        except OSError:
+            pass
+
     def setup_ui(self):
         # Create central widget and main layout
         central_widget = QWidget()
@@ -484,6 +2620,10 @@ class MainWindow(QMainWindow):
         export_action.triggered.connect(self.export_data)
         toolbar.addAction(export_action)
 
+        import_action = QAction("Import", self)
+        import_action.triggered.connect(self.import_data)
+        toolbar.addAction(import_action)
+
         # Create main content area
         content_widget = QWidget()
         layout.addWidget(content_widget)
@@ -503,19 +2643,67 @@ class MainWindow(QMainWindow):
         # Dashboard tab
         dashboard_tab = QWidget()
         dashboard_layout = QVBoxLayout(dashboard_tab)
-        
+
+        # Summary cards
+        cards_layout = QHBoxLayout()
+        self.stat_labels = {}
+        for key, title in [("items", "Total Items"), ("quantity", "Total Quantity"),
+                           ("low", "Low Stock Items"), ("damaged", "Damaged Items")]:
+            card = QFrame()
+            card.setStyleSheet("""
+                QFrame {
+                    background-color: #ffffff;
+                    border-radius: 8px;
+                    padding: 10px;
+                }
+            """)
+            card_layout = QVBoxLayout(card)
+            card_layout.addWidget(QLabel(title))
+            value_label = QLabel("-")
+            value_label.setFont(QFont("Arial", 20, QFont.Weight.Bold))
+            card_layout.addWidget(value_label)
+            self.stat_labels[key] = value_label
+            cards_layout.addWidget(card)
+        dashboard_layout.addLayout(cards_layout)
+
+        # Quantity breakdown chart
+        chart_layout = QHBoxLayout()
+        chart_layout.addWidget(QLabel("Quantity by:"))
+        self.chart_dimension = QComboBox()
+        self.chart_dimension.addItems(list(DASHBOARD_CHARTS))
+        self.chart_dimension.currentTextChanged.connect(lambda _: self.show_dashboard_chart())
+        chart_layout.addWidget(self.chart_dimension)
+        chart_layout.addStretch()
+        dashboard_layout.addLayout(chart_layout)
+
+        # The chart goes in once the window is on screen; see finish_startup
+        chart_area = QWidget()
+        chart_area.setMinimumHeight(250)
+        self.chart_layout = QVBoxLayout(chart_area)
+        self.chart_layout.setContentsMargins(0, 0, 0, 0)
+        dashboard_layout.addWidget(chart_area)
+        self.dashboard_chart = None
+        self.dashboard_stats = {}
+
+        # Items, shared by the dashboard's and the Items tab's tables
+        self.items_model = LazyQueryModel(ITEM_HEADERS, ITEM_COLUMNS, [(7, True)], parent=self)
+        # Results of the Items tab's search box, read only while it holds text
+        self.item_search_model = LazyQueryModel(ITEM_HEADERS, ITEM_COLUMNS, [(7, True)],
+                                                search=range(1, 7), parent=self)  # Exclude date column
+        self.item_search_model.release()
+
         # Recent items table
-        recent_label = QLabel("All Items")
-        recent_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
-        recent_label.setStyleSheet("color: #2c3e50; margin-top: 20px;")
-        dashboard_layout.addWidget(recent_label)
+        self.recent_label = QLabel("Recent Items")
+        self.recent_label.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        self.recent_label.setStyleSheet("color: #2c3e50; margin-top: 20px;")
+        dashboard_layout.addWidget(self.recent_label)
         
-        self.recent_items_table = QTableWidget()
-        self.recent_items_table.setColumnCount(7)
-        self.recent_items_table.setHorizontalHeaderLabels([
-            "Name", "Serial Number", "Project Name", 
-            "Quantity", "Location", "Description", "Date"
-        ])
+        self.recent_items_model = RecentRowsModel(self.items_model, RECENT_ITEMS_LIMIT, self)
+        self.recent_items_table = QTableView()
+        self.recent_items_table.setModel(self.recent_items_model)
+        # Clicking a header sorts just these rows
+        self.recent_items_table.setSortingEnabled(True)
+        self.recent_items_table.sortByColumn(-1, Qt.SortOrder.DescendingOrder)
         self.recent_items_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         dashboard_layout.addWidget(self.recent_items_table)
 
@@ -531,7 +2719,7 @@ class MainWindow(QMainWindow):
         self.items_search = QLineEdit()
         self.items_search.setPlaceholderText("Search items...")
         self.items_search.setMinimumWidth(300)
-        self.items_search.textChanged.connect(self.filter_items)
+        self.items_search.textChanged.connect(self.debounce(self.filter_items))
         items_toolbar.addWidget(self.items_search)
         
         # Sort dropdown
@@ -545,6 +2733,11 @@ class MainWindow(QMainWindow):
         export_btn.clicked.connect(self.export_data)
         items_toolbar.addWidget(export_btn)
         
+        # Import button
+        import_btn = QPushButton("Import")
+        import_btn.clicked.connect(self.import_data)
+        items_toolbar.addWidget(import_btn)
+        
         # Add item button
         add_item_btn = QPushButton("Add Item")
         add_item_btn.clicked.connect(self.show_add_item_dialog)
@@ -553,14 +2746,12 @@ class MainWindow(QMainWindow):
         items_layout.addLayout(items_toolbar)
         
         # Items table
-        self.items_table = QTableWidget()
-        self.items_table.setColumnCount(7)
-        self.items_table.setHorizontalHeaderLabels([
-            "Name", "Serial Number", "Project Name", 
-            "Quantity", "Location", "Description", "Date"
-        ])
+        self.items_proxy = QIdentityProxyModel(self)
+        self.items_proxy.setSourceModel(self.items_model)
+        self.items_table = QTableView()
+        self.items_table.setModel(self.items_proxy)
+        self.setup_sort_header(self.items_table, 6, Qt.SortOrder.DescendingOrder, self.sort_item_column)
         self.items_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.items_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         self.items_table.setWordWrap(True)
         self.items_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.items_table.customContextMenuRequested.connect(self.show_context_menu)
@@ -578,7 +2769,7 @@ class MainWindow(QMainWindow):
         self.movement_search = QLineEdit()
         self.movement_search.setPlaceholderText("Search movements...")
         self.movement_search.setMinimumWidth(300)
-        self.movement_search.textChanged.connect(self.filter_movements)
+        self.movement_search.textChanged.connect(self.debounce(self.filter_movements))
         movement_toolbar.addWidget(self.movement_search)
         
         # Sort dropdown
@@ -597,17 +2788,23 @@ class MainWindow(QMainWindow):
         record_movement_btn.clicked.connect(self.show_record_movement_dialog)
         movement_toolbar.addWidget(record_movement_btn)
         
+        # Batch movement button
+        batch_movement_btn = QPushButton("Batch Movement")
+        batch_movement_btn.clicked.connect(self.show_batch_movement_dialog)
+        movement_toolbar.addWidget(batch_movement_btn)
+        
         movement_layout.addLayout(movement_toolbar)
         
         # Movement table
-        self.movement_table = QTableWidget()
-        self.movement_table.setColumnCount(10)
-        self.movement_table.setHorizontalHeaderLabels([
-            "Date", "Item", "Serial Number", "Type", "From", "To", 
-            "Project Name", "Quantity", "Status", "Comments"
-        ])
+        self.movement_model = LazyQueryModel(
+            MOVEMENT_HEADERS, MOVEMENT_COLUMNS, [(1, True)],
+            prepare=lambda query: query.select_from(StockMovement).join(Item, StockMovement.item),
+            watch={"stock_movement": StockMovement.id, "item": StockMovement.item_id},
+            parent=self)
+        self.movement_table = QTableView()
+        self.movement_table.setModel(self.movement_model)
+        self.setup_sort_header(self.movement_table, 0, Qt.SortOrder.DescendingOrder, self.movement_model.sort)
         self.movement_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.movement_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         self.movement_table.setWordWrap(True)
         movement_layout.addWidget(self.movement_table)
 
@@ -623,7 +2820,7 @@ class MainWindow(QMainWindow):
         self.damaged_search = QLineEdit()
         self.damaged_search.setPlaceholderText("Search damaged items...")
         self.damaged_search.setMinimumWidth(300)
-        self.damaged_search.textChanged.connect(self.filter_damaged)
+        self.damaged_search.textChanged.connect(self.debounce(self.filter_damaged))
         damaged_toolbar.addWidget(self.damaged_search)
         
         # Export button
@@ -634,14 +2831,14 @@ class MainWindow(QMainWindow):
         damaged_layout.addLayout(damaged_toolbar)
         
         # Damaged items table
-        self.damaged_table = QTableWidget()
-        self.damaged_table.setColumnCount(7)
-        self.damaged_table.setHorizontalHeaderLabels([
-            "Name", "Serial Number", "Project Name", 
-            "Quantity", "Location", "Description", "Date"
-        ])
+        self.damaged_model = LazyQueryModel(
+            ITEM_HEADERS, ITEM_COLUMNS, [],
+            prepare=lambda query: query.filter(Item.status == "Damaged"),
+            parent=self)
+        self.damaged_table = QTableView()
+        self.damaged_table.setModel(self.damaged_model)
+        self.setup_sort_header(self.damaged_table, -1, Qt.SortOrder.AscendingOrder, self.damaged_model.sort)
         self.damaged_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.damaged_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
         self.damaged_table.setWordWrap(True)
         damaged_layout.addWidget(self.damaged_table)
 
@@ -677,7 +2874,7 @@ class MainWindow(QMainWindow):
         # Sort dropdown
         sort_combo = QComboBox()
         sort_combo.addItems(["Date Added", "Project Name", "Name"])
-        sort_combo.currentTextChanged.connect(self.sort_items)
+        sort_combo.currentTextChanged.connect(self.sort_recent_items)
         actions_layout.addWidget(sort_combo)
 
         # Export button
@@ -695,6 +2892,11 @@ class MainWindow(QMainWindow):
         record_movement_btn.clicked.connect(self.show_record_movement_dialog)
         actions_layout.addWidget(record_movement_btn)
 
+        # Batch movement button
+        batch_movement_btn = QPushButton("Batch Movement")
+        batch_movement_btn.clicked.connect(self.show_batch_movement_dialog)
+        actions_layout.addWidget(batch_movement_btn)
+
         # Search button
         search_btn = QPushButton("Search Items")
         search_btn.clicked.connect(self.show_search_dialog)
@@ -730,12 +2932,12 @@ class MainWindow(QMainWindow):
             QPushButton:hover {
                 background-color: #2980b9;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 1px solid #e0e0e0;
                 border-radius: 8px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 6px;
             }
             QHeaderView::section {
@@ -790,8 +2992,15 @@ class MainWindow(QMainWindow):
             }
         """)
         
-        # Load data after UI is set up
-        self.load_data()
+        # Data is loaded once the window has been drawn; see finish_startup
+        self.started = False
+
+        # Size the rows in view to their text
+        self.row_sizers = [RowHeightSizer(table) for table in
+                           [self.items_table, self.recent_items_table, self.movement_table, self.damaged_table]]
+
+        # Patch the tables with each committed change
+        change_notifier.committed.connect(self.apply_changes)
 
         # Connect tab change signal
         tabs.currentChanged.connect(self.on_tab_changed)
@@ -800,100 +3009,81 @@ class MainWindow(QMainWindow):
         central_widget.setLayout(content_layout)
 
     def load_data(self):
-        session = Session()
-        
-        # Load items
-        items = session.query(Item).order_by(Item.date_added.desc()).all()
-        self.items_table.setRowCount(len(items))
-        for i, item in enumerate(items):
-            self.items_table.setItem(i, 0, QTableWidgetItem(item.name))
-            self.items_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-            self.items_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-            self.items_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-            self.items_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-            self.items_table.setItem(i, 5, QTableWidgetItem(item.description))
-            self.items_table.setItem(i, 6, QTableWidgetItem(item.date_added.strftime("%Y-%m-%d")))
-
-        # Load all items for dashboard
-        self.recent_items_table.setRowCount(len(items))
-        for i, item in enumerate(items):
-            self.recent_items_table.setItem(i, 0, QTableWidgetItem(item.name))
-            self.recent_items_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-            self.recent_items_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-            self.recent_items_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-            self.recent_items_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-            self.recent_items_table.setItem(i, 5, QTableWidgetItem(item.description))
-            self.recent_items_table.setItem(i, 6, QTableWidgetItem(item.date_added.strftime("%Y-%m-%d")))
-
-        # Load damaged items
-        damaged_items = session.query(Item).filter(Item.status == "Damaged").all()
-        self.damaged_table.setRowCount(len(damaged_items))
-        for i, item in enumerate(damaged_items):
-            self.damaged_table.setItem(i, 0, QTableWidgetItem(item.name))
-            self.damaged_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-            self.damaged_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-            self.damaged_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-            self.damaged_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-            self.damaged_table.setItem(i, 5, QTableWidgetItem(item.description))
-            self.damaged_table.setItem(i, 6, QTableWidgetItem(item.date_added.strftime("%Y-%m-%d")))
-
-        # Load movements
-        movements = session.query(StockMovement).order_by(StockMovement.date.desc()).all()
-        self.movement_table.setRowCount(len(movements))
-        for i, movement in enumerate(movements):
-            self.movement_table.setItem(i, 0, QTableWidgetItem(movement.date.strftime("%Y-%m-%d")))
-            self.movement_table.setItem(i, 1, QTableWidgetItem(movement.item.name))
-            self.movement_table.setItem(i, 2, QTableWidgetItem(movement.item.serial_number))
-            self.movement_table.setItem(i, 3, QTableWidgetItem(movement.movement_type))
-            self.movement_table.setItem(i, 4, QTableWidgetItem(movement.from_location))
-            self.movement_table.setItem(i, 5, QTableWidgetItem(movement.to_location))
-            self.movement_table.setItem(i, 6, QTableWidgetItem(movement.project_category))
-            self.movement_table.setItem(i, 7, QTableWidgetItem(str(movement.quantity)))
-            self.movement_table.setItem(i, 8, QTableWidgetItem(movement.status))
-            self.movement_table.setItem(i, 9, QTableWidgetItem(movement.notes))
-
-        # Adjust row heights for all tables
-        self.adjust_table_row_heights()
-        
-        session.close()
-
-    def adjust_table_row_heights(self):
-        """Adjust row heights for all tables based on content"""
-        for table in [self.items_table, self.recent_items_table, self.movement_table, self.damaged_table]:
-            for row in range(table.rowCount()):
-                max_height = 0
-                for col in range(table.columnCount()):
-                    item = table.item(row, col)
-                    if item:
-                        # Calculate text height
-                        text = item.text()
-                        if text:
-                            # Estimate lines based on text length and column width
-                            col_width = table.columnWidth(col)
-                            avg_char_width = 8  # Approximate average character width
-                            chars_per_line = col_width / avg_char_width
-                            lines = len(text) / chars_per_line
-                            height = int(lines * 20) + 10  # 20 pixels per line, 10 pixels padding
-                            max_height = max(max_height, height)
-                
-                # Set row height
-                table.setRowHeight(row, max(max_height, 30))  # Minimum height of 30 pixels
+        for model in [self.items_model, self.damaged_model, self.movement_model, self.recent_items_model]:
+            model.reload()
+        if self.item_search_model.search_text:
+            self.item_search_model.reload()
+        item_completions.load()
+        self.refresh_dashboard()
+
+    def apply_changes(self, changes):
+        for model in [self.items_model, self.damaged_model, self.movement_model, self.recent_items_model]:
+            model.apply_changes(changes)
+        if self.item_search_model.search_text:
+            self.item_search_model.apply_changes(changes)
+        item_completions.apply_changes(changes)
+        if "item" in changes:
+            self.refresh_dashboard()
+
+    def refresh_dashboard(self):
+        """Update the summary cards and chart from the dashboard totals"""
+        try:
+            session = Session()
+            try:
+                self.dashboard_stats = query_dashboard_stats(session)
+            finally:
+                session.close()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading dashboard: {str(e)}")
+            return
+        statuses = self.dashboard_stats["status"].values()
+        self.stat_labels["items"].setText(f"{sum(items for items, _ in statuses):,}")
+        self.stat_labels["quantity"].setText(f"{sum(quantity for _, quantity in statuses):,}")
+        self.stat_labels["low"].setText(f"{self.dashboard_stats['stock'].get('low', (0, 0))[0]:,}")
+        self.stat_labels["damaged"].setText(f"{self.dashboard_stats['status'].get('Damaged', (0, 0))[0]:,}")
+        self.show_dashboard_chart()
+
+    def setup_dashboard_chart(self):
+        # QtCharts is only loaded once the window has been drawn
+        from PySide6.QtCharts import QChart, QChartView
+        self.dashboard_chart = QChart()
+        self.dashboard_chart.legend().setAlignment(Qt.AlignmentFlag.AlignRight)
+        chart_view = QChartView(self.dashboard_chart)
+        chart_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.chart_layout.addWidget(chart_view)
+        self.show_dashboard_chart()
+
+    def show_dashboard_chart(self):
+        if self.dashboard_chart is None:
+            return
+        from PySide6.QtCharts import QPieSeries
+        totals = sorted(((quantity, key) for key, (_, quantity)
+                         in self.dashboard_stats.get(DASHBOARD_CHARTS[self.chart_dimension.currentText()], {}).items()
+                         if quantity > 0), reverse=True)
+        # The largest slices, and the rest together
+        if len(totals) > DASHBOARD_CHART_SLICES:
+            totals[DASHBOARD_CHART_SLICES - 1:] = [(sum(quantity for quantity, _ in totals[DASHBOARD_CHART_SLICES - 1:]),
+                                                    "Other")]
+        series = QPieSeries()
+        for quantity, key in totals:
+            series.append(f"{key or '(none)'}: {quantity:,}", quantity)
+        self.dashboard_chart.removeAllSeries()
+        self.dashboard_chart.addSeries(series)
 
     def show_context_menu(self, position):
         menu = QMenu()
         edit_action = menu.addAction("Edit")
         delete_action = menu.addAction("Delete")
+        balances_action = menu.addAction("Stock by Location")
         menu.addSeparator()
         refresh_action = menu.addAction("Refresh")
 
         # Get the item at the clicked position
-        item = self.items_table.itemAt(position)
-        if item:
-            row = item.row()
+        index = self.items_table.indexAt(position)
+        if index.isValid():
             # Get the item data from the database
             session = Session()
-            item_name = self.items_table.item(row, 0).text()
-            db_item = session.query(Item).filter(Item.name == item_name).first()
+            db_item = session.get(Item, index.data(Qt.ItemDataRole.UserRole))
             session.close()
 
             if db_item:
@@ -902,6 +3092,8 @@ class MainWindow(QMainWindow):
                     self.edit_item(db_item)
                 elif action == delete_action:
                     self.delete_item(db_item)
+                elif action == balances_action:
+                    self.show_item_balances(db_item)
                 elif action == refresh_action:
                     self.load_data()
 
@@ -909,30 +3101,24 @@ class MainWindow(QMainWindow):
         dialog = AddItemDialog(self, item)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             try:
-                session = Session()
-                # Merge the item with the session to ensure it's tracked
-                item = session.merge(item)
-                item_data = dialog.get_item_data()
-                
-                # Update each field of the item
-                item.name = item_data['name']
-                item.serial_number = item_data['serial_number']
-                item.project_category = item_data['project_category']
-                item.description = item_data['description']
-                item.quantity = item_data['quantity']
-                item.supplier = item_data['supplier']
-                item.storage_location = item_data['storage_location']
-                item.date_added = item_data['date_added']
-                item.notes = item_data['notes']
-                
-                session.commit()
-                self.load_data()
+                with session_scope() as session:
+                    # Merge the item with the session to ensure it's tracked
+                    item = session.merge(item)
+                    item_data = dialog.get_item_data()
+                    
+                    # Update each field of the item
+                    item.name = item_data['name']
+                    item.serial_number = item_data['serial_number']
+                    item.project_category = item_data['project_category']
+                    item.description = item_data['description']
+                    item.quantity = item_data['quantity']
+                    item.supplier = item_data['supplier']
+                    item.storage_location = item_data['storage_location']
+                    item.date_added = item_data['date_added']
+                    item.notes = item_data['notes']
                 QMessageBox.information(self, "Success", "Item updated successfully!")
             except Exception as e:
-                session.rollback()
                 QMessageBox.critical(self, "Error", f"Error updating item: {str(e)}")
-            finally:
-                session.close()
 
     def delete_item(self, item):
         reply = QMessageBox.question(self, "Confirm Delete", 
@@ -942,139 +3128,123 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                session = Session()
-                session.delete(item)
-                session.commit()
-                self.load_data()
+                with session_scope() as session:
+                    session.delete(item)
                 QMessageBox.information(self, "Success", "Item deleted successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error deleting item: {str(e)}")
+
+    def show_item_balances(self, item):
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Stock by Location - {item.name}")
+        layout = QVBoxLayout(dialog)
+
+        # Current stock, or the stock at the end of an earlier day
+        date_layout = QHBoxLayout()
+        date_layout.addWidget(QLabel("As of:"))
+        date_input = QDateEdit(QDate.currentDate())
+        date_input.setCalendarPopup(True)
+        date_layout.addWidget(date_input)
+        date_layout.addStretch()
+        layout.addLayout(date_layout)
+
+        table = QTableWidget(0, 3)
+        table.setHorizontalHeaderLabels(["Location", "Project", "Quantity"])
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(table)
+        total_label = QLabel()
+        layout.addWidget(total_label)
+
+        def show_balances(day=None):
+            session = Session()
+            try:
+                if day is None:
+                    balances = query_item_balances(session, item.id)
+                else:
+                    as_of = datetime.combine(day + timedelta(days=1), datetime.min.time())
+                    # A replay can come out below zero where the history is
+                    # incomplete, e.g. before stock was first recorded, and
+                    # that is no stock rather than a debt
+                    balances = sorted((location, project, quantity) for (_, location, project), quantity
+                                      in stock_as_of(session, as_of, item.id).items() if quantity > 0)
+            except Exception as e:
+                QMessageBox.critical(dialog, "Error", f"Error loading stock: {str(e)}")
+                return
             finally:
                 session.close()
+            table.setRowCount(len(balances))
+            for row, (location, project, quantity) in enumerate(balances):
+                table.setItem(row, 0, QTableWidgetItem(location or "(none)"))
+                table.setItem(row, 1, QTableWidgetItem(project or "(none)"))
+                table.setItem(row, 2, QTableWidgetItem(str(quantity)))
+            total_label.setText(f"Total: {sum(quantity for _, _, quantity in balances)}")
+
+        date_input.dateChanged.connect(lambda date: show_balances(date.toPython()))
+        show_balances()
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(dialog.accept)
+        layout.addWidget(close_btn)
+        dialog.resize(450, 300)
+        dialog.exec()
 
-    def sort_items(self, sort_by):
-        session = Session()
+    def setup_sort_header(self, table, column, order, sort):
+        """Let a table's header sort its model, starting from the model's
+        own order; the sort combos move the header's indicator too"""
+        header = table.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(column, order)
+        header.sortIndicatorChanged.connect(sort)
+
+    @staticmethod
+    def item_sort(sort_by):
+        """Column and order of a "Sort by" choice for the item tables"""
         if sort_by == "Date Added":
-            items = session.query(Item).order_by(Item.date_added.desc()).all()
+            return 6, Qt.SortOrder.DescendingOrder
         elif sort_by == "Name":
-            items = session.query(Item).order_by(Item.name).all()
+            return 0, Qt.SortOrder.AscendingOrder
         else:  # Project Name
-            items = session.query(Item).order_by(Item.project_category).all()
-        
-        # Update both tables
-        self.items_table.setRowCount(len(items))
-        self.recent_items_table.setRowCount(len(items))
-        
-        for i, item in enumerate(items):
-            # Update items table
-            self.items_table.setItem(i, 0, QTableWidgetItem(item.name))
-            self.items_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-            self.items_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-            self.items_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-            self.items_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-            self.items_table.setItem(i, 5, QTableWidgetItem(item.description))
-            self.items_table.setItem(i, 6, QTableWidgetItem(item.date_added.strftime("%Y-%m-%d")))
-            
-            # Update recent items table
-            self.recent_items_table.setItem(i, 0, QTableWidgetItem(item.name))
-            self.recent_items_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-            self.recent_items_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-            self.recent_items_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-            self.recent_items_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-            self.recent_items_table.setItem(i, 5, QTableWidgetItem(item.description))
-            self.recent_items_table.setItem(i, 6, QTableWidgetItem(item.date_added.strftime("%Y-%m-%d")))
-        
-        # Adjust row heights after sorting
-        self.adjust_table_row_heights()
-        
-        session.close()
+            return 2, Qt.SortOrder.AscendingOrder
+
+    def sort_items(self, sort_by):
+        self.items_table.horizontalHeader().setSortIndicator(*self.item_sort(sort_by))
+
+    def sort_recent_items(self, sort_by):
+        # Reorders the dashboard's recent items, not which items they are
+        self.recent_items_table.sortByColumn(*self.item_sort(sort_by))
+
+    def sort_item_column(self, column, order):
+        # The search results follow the same order; the dashboard keeps its
+        # own, from its own window of rows if need be
+        self.items_model.sort(column, order)
+        self.item_search_model.sort(column, order)
 
     def show_add_item_dialog(self):
         dialog = AddItemDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             try:
-                session = Session()
-                new_item = Item(**dialog.get_item_data())
-                session.add(new_item)
-                session.commit()
-                self.load_data()
+                with session_scope() as session:
+                    session.add(Item(**dialog.get_item_data()))
                 QMessageBox.information(self, "Success", "Item added successfully!")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Error adding item: {str(e)}")
-            finally:
-                session.close()
 
     def show_record_movement_dialog(self):
         dialog = StockMovementDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             try:
-                session = Session()
-                movement_data = dialog.get_movement_data()
-                
-                # Find the item
-                item = session.query(Item).filter(Item.name == movement_data['item_name']).first()
-                if not item:
-                    raise Exception("Item not found")
-
-                # Check if quantity is available
-                if movement_data['movement_type'] in ['Out', 'Transferred'] and item.quantity < movement_data['quantity']:
-                    raise Exception("Insufficient quantity available")
-
-                # Create movement record
-                movement = StockMovement(
-                    item_id=item.id,
-                    movement_type=movement_data['movement_type'],
-                    from_location=movement_data['from_location'],
-                    to_location=movement_data['to_location'],
-                    project_category=movement_data['to_project'],
-                    quantity=movement_data['quantity'],
-                    status=movement_data['status'],
-                    date=movement_data['date'],
-                    notes=movement_data['notes']
-                )
-
-                # Handle different movement types
-                if movement_data['movement_type'] == 'In':
-                    # For incoming items, just update the quantity
-                    item.quantity += movement_data['quantity']
-                elif movement_data['movement_type'] == 'Out':
-                    # For outgoing items, just reduce the quantity
-                    item.quantity -= movement_data['quantity']
-                elif movement_data['movement_type'] == 'Transferred':
-                    # For transfers:
-                    # 1. Reduce quantity from original item
-                    item.quantity -= movement_data['quantity']
-                    
-                    # 2. Create new item entry with transferred quantity
-                    # Generate a unique serial number by appending transfer info
-                    new_serial = f"{item.serial_number}-TR{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
-                    
-                    new_item = Item(
-                        name=item.name,
-                        serial_number=new_serial,
-                        project_category=movement_data['to_project'],
-                        description=item.description,
-                        quantity=movement_data['quantity'],
-                        supplier=item.supplier,
-                        storage_location=movement_data['to_location'],
-                        date_added=datetime.now(timezone.utc),
-                        notes=f"Transferred from {movement_data['from_project']} ({movement_data['from_location']})"
-                    )
-                    session.add(new_item)
-
-                # Update item status if marked as damaged
-                if movement_data['status'] == "Damaged":
-                    item.status = "Damaged"
-
-                session.add(movement)
-                session.commit()
-                self.load_data()
+                post_movement(dialog.get_movement_data())
                 QMessageBox.information(self, "Success", "Movement recorded successfully!")
             except Exception as e:
-                session.rollback()
                 QMessageBox.critical(self, "Error", f"Error recording movement: {str(e)}")
-            finally:
-                session.close()
+
+    def show_batch_movement_dialog(self):
+        dialog = BatchMovementDialog(self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            QMessageBox.information(self, "Success", f"{dialog.posted} movements recorded successfully!")
 
     def on_tab_changed(self, index):
         # Show quick actions only on dashboard tab (index 0)
@@ -1090,7 +3260,7 @@ class MainWindow(QMainWindow):
         search_type_layout = QHBoxLayout()
         search_type_layout.addWidget(QLabel("Search by:"))
         search_type = QComboBox()
-        search_type.addItems(["Name", "Date", "Project Name", "Serial Number"])
+        search_type.addItems(["All Fields", "Name", "Date", "Project Name", "Serial Number"])
         search_type_layout.addWidget(search_type)
         layout.addLayout(search_type_layout)
         
@@ -1107,205 +3277,251 @@ class MainWindow(QMainWindow):
         ])
         layout.addWidget(results_table)
         
+        # Match count and the button reading the next page
+        footer_layout = QHBoxLayout()
+        status_label = QLabel()
+        footer_layout.addWidget(status_label)
+        footer_layout.addStretch()
+        load_more_btn = QPushButton("Load More")
+        load_more_btn.setEnabled(False)
+        footer_layout.addWidget(load_more_btn)
+        layout.addLayout(footer_layout)
+        
         # Add search functionality
+        columns = [Item.id, Item.name, Item.serial_number, Item.project_category,
+                   Item.quantity, Item.storage_location, Item.description, Item.notes]
+        page_worker = None
+        count_worker = None
+        total = None
+        last_id = None
+
+        def build_query(session, query, search_by, before=None):
+            if search_by != "Date":
+                return search_items(session, columns, query, SEARCH_FIELDS[search_by], before)
+            try:
+                search_date = datetime.strptime(query, "%Y-%m-%d").date()
+            except ValueError:
+                return None
+            items = session.query(*columns).filter(func.date(Item.date_added) == search_date)
+            if before is not None:
+                items = items.filter(Item.id < before)
+            return items.order_by(Item.id.desc())
+
         def perform_search():
+            nonlocal count_worker, total, last_id
             query = search_input.text().lower()
             search_by = search_type.currentText()
-            session = Session()
-            
-            if search_by == "Name":
-                items = session.query(Item).filter(Item.name.ilike(f'%{query}%')).all()
-            elif search_by == "Date":
-                try:
-                    search_date = datetime.strptime(query, "%Y-%m-%d").date()
-                    items = session.query(Item).filter(func.date(Item.date_added) == search_date).all()
-                except ValueError:
-                    items = []
-            elif search_by == "Project Name":
-                items = session.query(Item).filter(Item.project_category.ilike(f'%{query}%')).all()
-            else:  # Serial Number
-                items = session.query(Item).filter(Item.serial_number.ilike(f'%{query}%')).all()
-            
-            results_table.setRowCount(len(items))
-            for i, item in enumerate(items):
-                results_table.setItem(i, 0, QTableWidgetItem(item.name))
-                results_table.setItem(i, 1, QTableWidgetItem(item.serial_number))
-                results_table.setItem(i, 2, QTableWidgetItem(item.project_category))
-                results_table.setItem(i, 3, QTableWidgetItem(str(item.quantity)))
-                results_table.setItem(i, 4, QTableWidgetItem(item.storage_location))
-                results_table.setItem(i, 5, QTableWidgetItem(item.description))
-                results_table.setItem(i, 6, QTableWidgetItem(item.notes))
-            
-            session.close()
+
+            def count(session, worker):
+                items = build_query(session, query, search_by)
+                return 0 if items is None else items.order_by(None).count()
+
+            # Supersede the search for the previous keystroke
+            if count_worker is not None:
+                count_worker.cancel()
+            results_table.setRowCount(0)
+            total = None
+            last_id = None
+            fetch_page(query, search_by)
+            worker = Worker(count)
+            worker.signals.finished.connect(lambda result: show_count(worker, result))
+            count_worker = worker.start()
+
+        def fetch_page(query, search_by, before=None):
+            nonlocal page_worker
+
+            def search(session, worker):
+                items = build_query(session, query, search_by, before)
+                if items is None:
+                    return []
+                # One extra row tells whether there is another page
+                return [tuple(item) for item in items.limit(SEARCH_PAGE_SIZE + 1)]
+
+            if page_worker is not None:
+                page_worker.cancel()
+            load_more_btn.setEnabled(False)
+            worker = Worker(search)
+            worker.signals.finished.connect(lambda items: show_results(worker, items))
+            page_worker = worker.start()
+
+        def load_more():
+            fetch_page(search_input.text().lower(), search_type.currentText(), last_id)
+
+        def show_results(worker, items):
+            nonlocal last_id
+            if worker is not page_worker:
+                return
+            has_more = len(items) > SEARCH_PAGE_SIZE
+            items = items[:SEARCH_PAGE_SIZE]
+            first = results_table.rowCount()
+            results_table.setRowCount(first + len(items))
+            for i, (item_id, name, serial_number, project, quantity, location, description, notes) in enumerate(items, first):
+                name_item = QTableWidgetItem(name)
+                name_item.setData(Qt.ItemDataRole.UserRole, item_id)
+                results_table.setItem(i, 0, name_item)
+                results_table.setItem(i, 1, QTableWidgetItem(serial_number))
+                results_table.setItem(i, 2, QTableWidgetItem(project))
+                results_table.setItem(i, 3, QTableWidgetItem(str(quantity)))
+                results_table.setItem(i, 4, QTableWidgetItem(location))
+                results_table.setItem(i, 5, QTableWidgetItem(description))
+                results_table.setItem(i, 6, QTableWidgetItem(notes))
+            if items:
+                last_id = items[-1][0]
+            load_more_btn.setEnabled(has_more)
+            show_status()
+
+        def show_count(worker, result):
+            nonlocal total
+            if worker is not count_worker:
+                return
+            total = result
+            show_status()
+
+        def show_status():
+            shown = results_table.rowCount()
+            if total is None:
+                status_label.setText(f"Showing {shown} matches, counting...")
+            else:
+                status_label.setText(f"Showing {shown} of {total} matches")
         
-        search_input.textChanged.connect(perform_search)
+        search_input.textChanged.connect(self.debounce(perform_search, dialog))
+        search_type.currentTextChanged.connect(perform_search)
+        load_more_btn.clicked.connect(load_more)
         
         dialog.exec()
+        # Drop any result that arrives after the dialog is gone
+        page_worker = None
+        count_worker = None
+
+    def run_with_progress(self, title, label, job, finished, error_message, write=False):
+        """Run job on a worker behind a progress dialog that can cancel it"""
+        progress = QProgressDialog(label, "Cancel", 0, 0, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setMinimumDuration(0)
+
+        def show_progress(done, total):
+            progress.setMaximum(total)
+            progress.setValue(done)
+
+        def job_finished(result):
+            progress.close()
+            finished(result)
+
+        def job_failed(message):
+            progress.close()
+            QMessageBox.critical(self, "Error", f"{error_message}: {message}")
+
+        worker = Worker(job, write)
+        worker.signals.progress.connect(show_progress)
+        worker.signals.finished.connect(job_finished)
+        worker.signals.failed.connect(job_failed)
+        worker.signals.cancelled.connect(progress.close)
+        progress.canceled.connect(worker.cancel)
+        return worker.start()
 
     def export_data(self):
-        try:
-            session = Session()
-            items = session.query(Item).all()
-            movements = session.query(StockMovement).all()
-            damaged_items = session.query(Item).filter(Item.status == "Damaged").all()
-            
-            # Convert items to DataFrame
-            items_data = []
-            for item in items:
-                items_data.append({
-                    'Name': item.name,
-                    'Serial Number': item.serial_number,
-                    'Project Name': item.project_category,
-                    'Quantity': item.quantity,
-                    'Location': item.storage_location,
-                    'Description': item.description,
-                    'Date Added': item.date_added.strftime("%Y-%m-%d"),
-                    'Status': item.status,
-                    'Notes': item.notes
-                })
-            
-            # Convert movements to DataFrame
-            movements_data = []
-            for movement in movements:
-                movements_data.append({
-                    'Date': movement.date.strftime("%Y-%m-%d"),
-                    'Item': movement.item.name,
-                    'Serial Number': movement.item.serial_number,
-                    'Type': movement.movement_type,
-                    'From': movement.from_location,
-                    'To': movement.to_location,
-                    'Project Name': movement.project_category,
-                    'Quantity': movement.quantity,
-                    'Status': movement.status,
-                    'Comments': movement.notes
-                })
-            
-            # Convert damaged items to DataFrame
-            damaged_data = []
-            for item in damaged_items:
-                # Find the movement that marked this item as damaged
-                damaged_movement = session.query(StockMovement).filter(
-                    StockMovement.item_id == item.id,
-                    StockMovement.status == "Damaged"
-                ).first()
-                
-                damaged_data.append({
-                    'Name': item.name,
-                    'Serial Number': item.serial_number,
-                    'Project Name': item.project_category,
-                    'Quantity': item.quantity,
-                    'Location': item.storage_location,
-                    'Description': item.description,
-                    'Date Added': item.date_added.strftime("%Y-%m-%d"),
-                    'Date Damaged': damaged_movement.date.strftime("%Y-%m-%d") if damaged_movement else "N/A",
-                    'Damage Notes': damaged_movement.notes if damaged_movement else "N/A",
-                    'Item Notes': item.notes
-                })
-            
-            items_df = pd.DataFrame(items_data)
-            movements_df = pd.DataFrame(movements_data)
-            damaged_df = pd.DataFrame(damaged_data)
-            
-            # Save to file
-            file_name, _ = QFileDialog.getSaveFileName(
-                self, "Export Data", "", "Excel Files (*.xlsx);;CSV Files (*.csv)"
-            )
-            
-            if file_name:
-                if file_name.endswith('.xlsx'):
-                    with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
-                        # Write items sheet
-                        items_df.to_excel(writer, sheet_name='Inventory Items', index=False)
-                        # Write movements sheet
-                        movements_df.to_excel(writer, sheet_name='Stock Movement', index=False)
-                        # Write damaged items sheet
-                        if not damaged_df.empty:
-                            damaged_df.to_excel(writer, sheet_name='Damaged Items', index=False)
-                        
-                        # Auto-adjust column widths
-                        for sheet_name in writer.sheets:
-                            worksheet = writer.sheets[sheet_name]
-                            for column in worksheet.columns:
-                                max_length = 0
-                                column = [cell for cell in column]
-                                for cell in column:
-                                    try:
-                                        if len(str(cell.value)) > max_length:
-                                            max_length = len(str(cell.value))
-                                    except:
-                                        pass
-                                adjusted_width = (max_length + 2)
-                                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-                else:
-                    items_df.to_csv(file_name.replace('.csv', '_items.csv'), index=False)
-                    movements_df.to_csv(file_name.replace('.csv', '_movements.csv'), index=False)
-                    if not damaged_df.empty:
-                        damaged_df.to_csv(file_name.replace('.csv', '_damaged.csv'), index=False)
-                QMessageBox.information(self, "Success", "Data exported successfully!")
-            
-            session.close()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error exporting data: {str(e)}")
+        # Save to file
+        file_name, _ = QFileDialog.getSaveFileName(
+            self, "Export Data", "", "Excel Files (*.xlsx);;CSV Files (*.csv)"
+        )
+        if not file_name:
+            return
+
+        def export(session, worker):
+            if file_name.endswith('.xlsx'):
+                export_xlsx(session, file_name, worker.report)
+            else:
+                export_csv(session, file_name, worker.report)
+
+        self.run_with_progress(
+            "Export Data", "Exporting data...", export,
+            lambda result: QMessageBox.information(self, "Success", "Data exported successfully!"),
+            "Error exporting data")
+
+    def import_data(self):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "Import Data", "", "Spreadsheets (*.xlsx *.csv)"
+        )
+        if not file_name:
+            return
+
+        def import_finished(report):
+            if not report.errors:
+                QMessageBox.information(self, "Import Finished", report.summary())
+                return
+            reply = QMessageBox.question(self, "Import Finished",
+                                         report.summary() + "\n\nSave the list of rejected rows?",
+                                         QMessageBox.StandardButton.Yes |
+                                         QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes:
+                error_file, _ = QFileDialog.getSaveFileName(
+                    self, "Save Import Errors", "", "CSV Files (*.csv)"
+                )
+                if error_file:
+                    report.write_errors(error_file)
+
+        self.run_with_progress(
+            "Import Data", "Importing data...",
+            lambda session, worker: import_spreadsheet(session, file_name, worker.report),
+            import_finished, "Error importing data", write=True)
+
+    def debounce(self, callback, parent=None):
+        """Return a slot that runs callback once typing pauses"""
+        timer = QTimer(parent or self)
+        timer.setSingleShot(True)
+        timer.setInterval(FILTER_DELAY_MS)
+        timer.timeout.connect(callback)
+        return lambda *args: timer.start()
 
     def filter_items(self):
-        search_text = self.items_search.text().lower()
-        for row in range(self.items_table.rowCount()):
-            show_row = False
-            for col in range(self.items_table.columnCount() - 1):  # Exclude actions column
-                item = self.items_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    show_row = True
-                    break
-            self.items_table.setRowHidden(row, not show_row)
+        search_text = self.items_search.text().strip()
+        if search_text:
+            self.item_search_model.set_search(search_text)
+            source = self.item_search_model
+        else:
+            self.item_search_model.release()
+            self.item_search_model.search_text = ""
+            source = self.items_model
+        if self.items_proxy.sourceModel() is not source:
+            self.items_proxy.setSourceModel(source)
 
     def filter_movements(self):
-        search_text = self.movement_search.text().lower()
-        for row in range(self.movement_table.rowCount()):
-            show_row = False
-            for col in range(self.movement_table.columnCount()):
-                item = self.movement_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    show_row = True
-                    break
-            self.movement_table.setRowHidden(row, not show_row)
+        self.movement_model.set_search(self.movement_search.text())
 
     def sort_movements(self, sort_by):
-        session = Session()
         if sort_by == "Date":
-            movements = session.query(StockMovement).order_by(StockMovement.date.desc()).all()
+            column, order = 0, Qt.SortOrder.DescendingOrder
         elif sort_by == "Item":
-            movements = session.query(StockMovement).order_by(Item.name).join(Item).all()
+            column, order = 1, Qt.SortOrder.AscendingOrder
         else:  # Type
-            movements = session.query(StockMovement).order_by(StockMovement.movement_type).all()
-        
-        self.movement_table.setRowCount(len(movements))
-        for i, movement in enumerate(movements):
-            self.movement_table.setItem(i, 0, QTableWidgetItem(movement.date.strftime("%Y-%m-%d")))
-            self.movement_table.setItem(i, 1, QTableWidgetItem(movement.item.name))
-            self.movement_table.setItem(i, 2, QTableWidgetItem(movement.item.serial_number))
-            self.movement_table.setItem(i, 3, QTableWidgetItem(movement.movement_type))
-            self.movement_table.setItem(i, 4, QTableWidgetItem(movement.from_location))
-            self.movement_table.setItem(i, 5, QTableWidgetItem(movement.to_location))
-            self.movement_table.setItem(i, 6, QTableWidgetItem(movement.project_category))
-            self.movement_table.setItem(i, 7, QTableWidgetItem(str(movement.quantity)))
-            self.movement_table.setItem(i, 8, QTableWidgetItem(movement.status))
-            self.movement_table.setItem(i, 9, QTableWidgetItem(movement.notes))
-        
-        session.close()
+            column, order = 3, Qt.SortOrder.AscendingOrder
+        self.movement_table.horizontalHeader().setSortIndicator(column, order)
 
     def filter_damaged(self):
-        search_text = self.damaged_search.text().lower()
-        for row in range(self.damaged_table.rowCount()):
-            show_row = False
-            for col in range(self.damaged_table.columnCount()):
-                item = self.damaged_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    show_row = True
-                    break
-            self.damaged_table.setRowHidden(row, not show_row)
+        self.damaged_model.set_search(self.damaged_search.text())
+
+mark_startup("load app module")
 
 if __name__ == '__main__':
+    upgrade_database(engine)
+    mark_startup("upgrade database")
+    if "--rebuild-search-index" in sys.argv[1:]:
+        with engine.begin() as connection:
+            rebuild_item_search_index(connection)
+        print("Search index rebuilt")
+        sys.exit(0)
     app = QApplication(sys.argv)
+    mark_startup("start Qt")
     window = MainWindow()
     window.show()
-    sys.exit(app.exec()) 
\ No newline at end of file
+    exit_code = app.exec()
+    # Let background jobs wind down before their signal objects go away
+    for worker in list(Worker.active):
+        worker.cancel()
+    QThreadPool.globalInstance().waitForDone()
+    # Close the pooled connections, which checkpoints the WAL into the database
+    engine.dispose()
+    sys.exit(exit_code) 
\ No newline at end of file
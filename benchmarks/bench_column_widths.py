@@ -0,0 +1,83 @@
+"""Compare the old cell-by-cell column autosizing with column_widths().
+
+The old export wrote every row into an in-memory workbook, then walked each
+cell of each column to find the longest value. The new one sizes columns
+from the row data before writing, either from every row or from the sample
+the export actually uses.
+
+    python benchmarks/bench_column_widths.py --rows 500000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from app import EXPORT_BATCH_SIZE, EXPORT_WIDTH_SAMPLE, MOVEMENT_HEADERS, column_widths
+
+def make_rows(count):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    locations = ["Stores", "Data Office", "Container", "Field Work"]
+    return [((start + timedelta(minutes=rng.randrange(2_000_000))).strftime("%Y-%m-%d"),
+             f"Item {rng.randrange(20000)}", f"SN{rng.randrange(10 ** 8):08d}",
+             rng.choice(["In", "Out", "Transferred"]), rng.choice(locations), rng.choice(locations),
+             f"Project {rng.randrange(50)}", rng.randrange(1, 500), rng.choice(["Active", "Damaged"]),
+             rng.choice([None, "Delivered to site", "Returned after survey " * rng.randrange(1, 4)]))
+            for _ in range(count)]
+
+def legacy_widths(rows):
+    worksheet = Workbook().active
+    worksheet.append(MOVEMENT_HEADERS)
+    for row in rows:
+        worksheet.append(row)
+
+    started = time.perf_counter()
+    widths = []
+    for column in worksheet.columns:
+        max_length = 0
+        column = [cell for cell in column]
+        for cell in column:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        widths.append(max_length + 2)
+    return widths, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    started = time.perf_counter()
+    legacy, legacy_scan = legacy_widths(rows)
+    legacy_total = time.perf_counter() - started
+
+    started = time.perf_counter()
+    full = column_widths(MOVEMENT_HEADERS, rows)
+    full_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sample = rows[:EXPORT_BATCH_SIZE] + random.sample(rows, min(EXPORT_WIDTH_SAMPLE, len(rows)))
+    sampled = column_widths(MOVEMENT_HEADERS, sample)
+    sampled_time = time.perf_counter() - started
+
+    print(f"{args.rows} rows x {len(MOVEMENT_HEADERS)} columns")
+    print(f"{'cell walk (after fill)':<28}{legacy_scan:>10.3f}s  (workbook fill + walk {legacy_total:.3f}s)")
+    print(f"{'column_widths, all rows':<28}{full_time:>10.3f}s")
+    print(f"{'column_widths, sampled':<28}{sampled_time:>10.3f}s")
+    print(f"{'cell walk widths':<28}{legacy}")
+    print(f"{'all-row widths':<28}{full}")
+    print(f"{'sampled widths':<28}{sampled}")
+
+if __name__ == "__main__":
+    main()
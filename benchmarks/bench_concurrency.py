@@ -0,0 +1,137 @@
+"""Concurrent readers and writers against the default and the tuned engine.
+
+Reader threads page through the newest items, as the tables do, while
+writer threads record movements and adjust item quantities, as several
+users would. Each configuration gets its own throwaway database.
+
+    python benchmarks/bench_concurrency.py --readers 4 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import Item, StockMovement, make_engine, upgrade_database
+
+CONFIGURATIONS = [
+    # The engine as it was: a rollback journal, full sync and a new
+    # connection for every session
+    ("default", lambda path: create_engine(f"sqlite:///{path}")),
+    ("tuned", make_engine),
+]
+
+def populate(path, items):
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_database(engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO item (name, serial_number, project_category, quantity, storage_location, "
+        "date_added, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"Item {rng.randrange(items // 4 or 1)}", f"SN{i:08d}", f"Project {rng.randrange(50)}",
+          1000, "Stores", str(start + timedelta(minutes=rng.randrange(2_000_000))), "Active")
+         for i in range(1, items + 1)))
+    connection.commit()
+    connection.close()
+
+def reader(Session, items, stop, results):
+    rng = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session = Session()
+        try:
+            offset = rng.randrange(0, max(items - 256, 1))
+            session.query(Item.id, Item.name, Item.quantity).order_by(
+                Item.date_added.desc(), Item.id.desc()).offset(offset).limit(256).all()
+            session.query(StockMovement.id).order_by(StockMovement.id.desc()).limit(256).all()
+        except OperationalError:
+            results["errors"] += 1
+            continue
+        finally:
+            session.close()
+        results["latencies"].append(time.perf_counter() - started)
+
+def writer(Session, items, stop, results):
+    rng = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session = Session()
+        try:
+            item = session.get(Item, rng.randrange(1, items + 1))
+            item.quantity -= 1
+            session.add(StockMovement(item_id=item.id, movement_type="Out", from_location="Stores",
+                                      to_location="Field Work", quantity=1, status="Active",
+                                      date=datetime.now()))
+            session.commit()
+        except OperationalError:
+            session.rollback()
+            results["errors"] += 1
+            continue
+        finally:
+            session.close()
+        results["latencies"].append(time.perf_counter() - started)
+
+def run(make, path, args):
+    engine = make(path)
+    Session = sessionmaker(bind=engine)
+    # Writers begin their transactions the way the application's write
+    # sessions do; the default engine ignores the option
+    WriteSession = sessionmaker(bind=engine.execution_options(sqlite_begin="BEGIN IMMEDIATE"))
+    stop = threading.Event()
+    reads = [{"latencies": [], "errors": 0} for _ in range(args.readers)]
+    writes = [{"latencies": [], "errors": 0} for _ in range(args.writers)]
+    threads = ([threading.Thread(target=reader, args=(Session, args.items, stop, results)) for results in reads]
+               + [threading.Thread(target=writer, args=(WriteSession, args.items, stop, results)) for results in writes])
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return reads, writes
+
+def summarize(label, results, seconds):
+    latencies = sorted(latency for result in results for latency in result["latencies"])
+    errors = sum(result["errors"] for result in results)
+    if not latencies:
+        return f"{label:<8}{0:>10}{'-':>10}{'-':>10}{errors:>8}"
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    return (f"{label:<8}{len(latencies) / seconds:>10.1f}{statistics.median(latencies) * 1000:>10.2f}"
+            f"{p95 * 1000:>10.2f}{errors:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make in CONFIGURATIONS:
+            path = os.path.join(directory, f"{name}.db")
+            populate(path, args.items)
+            reads, writes = run(make, path, args)
+            print(f"{name}: {args.readers} readers, {args.writers} writers, {args.seconds:g}s")
+            print(f"{'':<8}{'ops/s':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'errors':>8}")
+            print(summarize("read", reads, args.seconds))
+            print(summarize("write", writes, args.seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Check and time the damaged-items export query against the old N+1 lookup.
+
+Builds a fixture database, produces the "Damaged Items" sheet rows with the
+previous per-item StockMovement lookup and with query_damaged_items(), fails
+if they differ and prints how long each took.
+
+    python benchmarks/bench_damaged_export.py --items 50000 --movements 300000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import (Item, StockMovement, QueryCounter, format_damaged_row, query_damaged_items,
+                 upgrade_database)
+
+def populate(session, items, movements):
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    session.bulk_insert_mappings(Item, [
+        {"id": i, "name": f"Item {i}", "serial_number": f"SN{i:08d}",
+         "project_category": f"Project {rng.randrange(50)}", "quantity": rng.randrange(500),
+         "storage_location": "Stores", "description": rng.choice([None, "Spare part"]),
+         "date_added": start + timedelta(minutes=i),
+         "status": "Damaged" if rng.random() < 0.05 else "Active",
+         "notes": rng.choice([None, "Checked"])}
+        for i in range(1, items + 1)])
+    # Some damaged items have several damaging movements, some have none,
+    # and some damage notes are empty
+    session.bulk_insert_mappings(StockMovement, [
+        {"item_id": rng.randrange(1, items + 1), "movement_type": rng.choice(["In", "Out"]),
+         "quantity": 1, "status": "Damaged" if rng.random() < 0.1 else "Active",
+         "date": start + timedelta(minutes=rng.randrange(2_000_000)),
+         "notes": rng.choice([None, "Dropped", "Water damage"])}
+        for _ in range(movements)])
+    session.commit()
+
+def legacy_rows(session):
+    rows = []
+    for item in session.query(Item).filter(Item.status == "Damaged").all():
+        damaged_movement = session.query(StockMovement).filter(
+            StockMovement.item_id == item.id,
+            StockMovement.status == "Damaged"
+        ).first()
+        rows.append((item.name, item.serial_number, item.project_category, item.quantity,
+                     item.storage_location, item.description, item.date_added.strftime("%Y-%m-%d"),
+                     damaged_movement.date.strftime("%Y-%m-%d") if damaged_movement else "N/A",
+                     damaged_movement.notes if damaged_movement else "N/A",
+                     item.notes))
+    return rows
+
+def single_query_rows(session):
+    return [format_damaged_row(tuple(row)) for row in query_damaged_items(session)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--movements", type=int, default=300_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'fixture.db')}")
+        upgrade_database(engine)
+        Session = sessionmaker(bind=engine)
+        session = Session()
+        populate(session, args.items, args.movements)
+
+        results = {}
+        for label, build in [("per-item lookup", legacy_rows), ("single query", single_query_rows)]:
+            session.expunge_all()
+            with QueryCounter(engine) as counter:
+                started = time.perf_counter()
+                results[label] = build(session)
+                elapsed = time.perf_counter() - started
+            print(f"{label:<18}{len(results[label]):>8} rows{counter.count:>8} queries{elapsed:>10.3f}s")
+        session.close()
+        engine.dispose()
+
+    if results["per-item lookup"] != results["single query"]:
+        sys.exit("Damaged sheet rows differ between the two implementations")
+    print("Damaged sheet rows match")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Time the app's lookup queries before and after the index migration.
+
+Builds a throwaway database with the pre-migration schema, times each
+query, runs upgrade_database() on it and times them again.
+
+    python benchmarks/bench_indexes.py --items 80000 --movements 600000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from app import Base, upgrade_database
+
+QUERIES = [
+    ("item by name", "SELECT id FROM item WHERE name = :name"),
+    ("damaged items", "SELECT id, name FROM item WHERE status = 'Damaged' ORDER BY id LIMIT 256"),
+    ("newest items", "SELECT id, name FROM item ORDER BY date_added DESC, id DESC LIMIT 256"),
+    ("items by project", "SELECT id, name FROM item ORDER BY project_category, id LIMIT 256"),
+    ("movements of item", "SELECT id FROM stock_movement WHERE item_id = :item_id ORDER BY date"),
+    ("newest movements", "SELECT m.id, i.name FROM stock_movement m JOIN item i ON i.id = m.item_id "
+                         "ORDER BY m.date DESC, m.id DESC LIMIT 256"),
+    ("damage of item", "SELECT id FROM stock_movement WHERE item_id = :item_id AND status = 'Damaged' LIMIT 1"),
+]
+
+def populate(path, items, movements):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Start from the schema as it was before the index migration
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX {index.name}"))
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    locations = ["Stores", "Data Office", "Container", "Field Work"]
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO item (id, name, serial_number, project_category, quantity, storage_location, "
+        "date_added, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"Item {rng.randrange(items // 4 or 1)}", f"SN{i:08d}", f"Project {rng.randrange(50)}",
+          rng.randrange(500), rng.choice(locations),
+          str(start + timedelta(minutes=rng.randrange(2_000_000))),
+          "Damaged" if rng.random() < 0.02 else "Active")
+         for i in range(1, items + 1)))
+    connection.executemany(
+        "INSERT INTO stock_movement (item_id, movement_type, from_location, to_location, quantity, "
+        "status, date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randrange(1, items + 1), rng.choice(["In", "Out", "Transferred"]),
+          rng.choice(locations), rng.choice(locations), rng.randrange(1, 20),
+          "Damaged" if rng.random() < 0.01 else "Active",
+          str(start + timedelta(minutes=rng.randrange(2_000_000))))
+         for _ in range(movements)))
+    connection.commit()
+    connection.close()
+
+def time_queries(path, repeat, items):
+    rng = random.Random(7)
+    engine = create_engine(f"sqlite:///{path}")
+    timings = {}
+    with engine.connect() as connection:
+        for label, sql in QUERIES:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(sql), {"name": f"Item {rng.randrange(items // 4 or 1)}",
+                                               "item_id": rng.randrange(1, items + 1)}).fetchall()
+            timings[label] = (time.perf_counter() - started) / repeat
+    engine.dispose()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=80_000)
+    parser.add_argument("--movements", type=int, default=600_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"Populating {args.items} items and {args.movements} movements...")
+        populate(path, args.items, args.movements)
+
+        before = time_queries(path, args.repeat, args.items)
+        started = time.perf_counter()
+        upgrade_database(create_engine(f"sqlite:///{path}"))
+        print(f"Migration took {time.perf_counter() - started:.2f}s")
+        after = time_queries(path, args.repeat, args.items)
+
+    print(f"{'query':<20}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for label, _ in QUERIES:
+        print(f"{label:<20}{before[label] * 1000:>14.3f}{after[label] * 1000:>14.3f}"
+              f"{before[label] / after[label]:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
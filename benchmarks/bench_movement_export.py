@@ -0,0 +1,92 @@
+"""Check that an export runs the same statements however many movements there are.
+
+Builds two throwaway databases that differ only in their number of stock
+movements, exports each to xlsx and CSV, and fails if the larger one runs
+more statements, as it would if the "Stock Movement" sheet went back to
+loading each movement's item separately.
+
+    python benchmarks/bench_movement_export.py --items 2000 --movements 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import EXPORT_BATCH_SIZE, QueryCounter, export_csv, export_xlsx, upgrade_database
+
+def populate(path, items, movements):
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_database(engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    locations = ["Stores", "Data Office", "Container", "Field Work"]
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO item (id, name, serial_number, project_category, quantity, storage_location, "
+        "date_added, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"Item {i}", f"SN{i:08d}", f"Project {i % 50}", 100, locations[i % 4],
+          str(start + timedelta(minutes=i)), "Damaged" if i % 20 == 0 else "Active")
+         for i in range(1, items + 1)))
+    connection.executemany(
+        "INSERT INTO stock_movement (item_id, movement_type, quantity, from_location, to_location, "
+        "project_category, status, date, notes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((rng.randrange(1, items + 1), rng.choice(["In", "Out", "Transferred"]), rng.randrange(1, 10),
+          rng.choice(locations), rng.choice(locations), f"Project {rng.randrange(50)}",
+          rng.choice(["Active", "Active", "Damaged"]), str(start + timedelta(minutes=rng.randrange(2_000_000))),
+          rng.choice([None, "Delivered to site"]))
+         for _ in range(movements)))
+    connection.commit()
+    connection.close()
+
+def count_export(path, directory):
+    """Statements run and seconds taken by each kind of export"""
+    engine = create_engine(f"sqlite:///{path}")
+    session = sessionmaker(bind=engine)()
+    results = {}
+    for label, export, file_name in [("xlsx", export_xlsx, "export.xlsx"), ("csv", export_csv, "export.csv")]:
+        with QueryCounter(engine) as counter:
+            started = time.perf_counter()
+            export(session, os.path.join(directory, file_name), lambda done, total: None)
+            elapsed = time.perf_counter() - started
+        results[label] = (counter.count, elapsed)
+        session.rollback()
+    session.close()
+    engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--movements", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # Both sizes fill more than one batch, so both sample their column widths
+    sizes = [2 * EXPORT_BATCH_SIZE, max(args.movements, 2 * EXPORT_BATCH_SIZE)]
+    counts = {}
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'movements':>10}{'export':>8}{'statements':>12}{'seconds':>10}")
+        for movements in sizes:
+            path = os.path.join(directory, f"{movements}.db")
+            populate(path, args.items, movements)
+            for label, (count, elapsed) in count_export(path, directory).items():
+                counts.setdefault(label, []).append(count)
+                print(f"{movements:>10}{label:>8}{count:>12}{elapsed:>10.2f}")
+
+    failed = [label for label, (small, large) in counts.items() if large != small]
+    if failed:
+        sys.exit(f"The {', '.join(failed)} export ran more statements with more movements")
+    print("Statement counts don't depend on the number of movements")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Time the Search Items dialog's queries: the old LIKE scans against FTS5.
+
+Builds a throwaway database with the current schema, including the
+item_search index, and times each search term through both paths, both
+reading every match and reading the first page the dialog shows.
+
+    python benchmarks/bench_search.py --items 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import SEARCH_PAGE_SIZE, Item, search_items, upgrade_database
+
+COLUMNS = [Item.id, Item.name, Item.serial_number, Item.project_category,
+           Item.quantity, Item.storage_location, Item.description, Item.notes]
+
+# A vocabulary large enough that a typed word narrows the results, as it
+# does on a real inventory
+SYLLABLES = ["ba", "ce", "di", "fo", "gu", "ka", "le", "mi", "no", "pu", "ra", "se", "ti", "vo", "za"]
+WORDS = sorted({"".join(random.Random(seed).choices(SYLLABLES, k=4)) for seed in range(3000)})
+
+# (label, typed text, old LIKE column, full-text field)
+SEARCHES = [
+    ("name, one word", WORDS[100][:6], Item.name, "name"),
+    ("serial number", "sn000412", Item.serial_number, "serial_number"),
+    ("project", "project 4", Item.project_category, "project_category"),
+    ("all fields", WORDS[300], None, None),
+]
+
+def populate(path, items):
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade_database(engine)
+    engine.dispose()
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    locations = ["Stores", "Data Office", "Container", "Field Work"]
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO item (name, serial_number, project_category, quantity, storage_location, "
+        "description, notes, date_added, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((" ".join(rng.sample(WORDS, 2)).title(), f"SN{i:08d}", f"Project {rng.randrange(50)}",
+          rng.randrange(500), rng.choice(locations), " ".join(rng.choices(WORDS, k=8)),
+          rng.choice([None, " ".join(rng.choices(WORDS, k=4))]),
+          str(start + timedelta(minutes=rng.randrange(2_000_000))), "Active")
+         for i in range(1, items + 1)))
+    connection.commit()
+    connection.close()
+
+def like_search(session, search_text, like_column):
+    """The dialog's query before the full-text index"""
+    query = session.query(*COLUMNS)
+    if like_column is None:
+        return query.filter(Item.name.ilike(f"%{search_text}%") | Item.description.ilike(f"%{search_text}%")
+                            | Item.notes.ilike(f"%{search_text}%"))
+    return query.filter(like_column.ilike(f"%{search_text}%"))
+
+def time_search(session, build, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        rows = build().all()
+    return (time.perf_counter() - started) / repeat, len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        print(f"Populating {args.items} items...")
+        populate(path, args.items)
+
+        engine = create_engine(f"sqlite:///{path}")
+        session = sessionmaker(bind=engine)()
+        print(f"{'search':<18}{'LIKE (ms)':>12}{'rows':>8}{'FTS5 (ms)':>12}{'rows':>8}{'speedup':>10}"
+              f"{'first page (ms)':>18}")
+        for label, search_text, like_column, field in SEARCHES:
+            like_time, like_rows = time_search(
+                session, lambda: like_search(session, search_text, like_column), args.repeat)
+            fts_time, fts_rows = time_search(
+                session, lambda: search_items(session, COLUMNS, search_text, field), args.repeat)
+            page_time, _ = time_search(
+                session, lambda: search_items(session, COLUMNS, search_text, field).limit(SEARCH_PAGE_SIZE + 1),
+                args.repeat)
+            print(f"{label:<18}{like_time * 1000:>12.2f}{like_rows:>8}{fts_time * 1000:>12.2f}{fts_rows:>8}"
+                  f"{like_time / fts_time:>9.1f}x{page_time * 1000:>18.2f}")
+        session.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Post movements on a few hot items from several processes at once.
+
+Every process posts random "In" and "Out" movements against the same
+items. Afterwards each item's quantity must equal its starting quantity
+plus the movements that were posted, and must not be negative.
+A lost update or an oversold item makes the script exit with status 1.
+
+    python benchmarks/stress_movements.py --processes 8 --posts 300
+    python benchmarks/stress_movements.py --legacy    # the old read-check-write code
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def movement(item_id, movement_type, quantity):
+    return {"item_id": item_id, "movement_type": movement_type, "quantity": quantity,
+            "from_project": "", "to_project": "", "from_location": "Stores",
+            "to_location": "Stores", "status": "Active", "date": datetime.now(), "notes": ""}
+
+def legacy_post(app, Session, movement_data):
+    """The dialog's posting code before post_movement: check in Python, then write"""
+    session = Session()
+    try:
+        item = session.get(app.Item, movement_data["item_id"])
+        if movement_data["movement_type"] == "Out" and item.quantity < movement_data["quantity"]:
+            raise app.PostingError([(1, "Insufficient quantity available")])
+        session.add(app.StockMovement(item_id=item.id, movement_type=movement_data["movement_type"],
+                                      quantity=movement_data["quantity"], date=movement_data["date"]))
+        if movement_data["movement_type"] == "In":
+            item.quantity += movement_data["quantity"]
+        else:
+            item.quantity -= movement_data["quantity"]
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def poster(worker, args, results):
+    # app reads INVENTORY_DB_PATH when it is imported, in this process
+    sys.path.insert(0, REPO)
+    import app
+    if args.legacy:
+        # With the engine as it was, whose transactions began at the first write
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        Session = sessionmaker(bind=create_engine(f"sqlite:///{app.DB_PATH}"))
+        post = lambda data: legacy_post(app, Session, data)
+    else:
+        post = app.post_movement
+
+    rng = random.Random(worker)
+    posted = {}
+    rejected = errors = 0
+    for _ in range(args.posts):
+        item_id = rng.randrange(1, args.items + 1)
+        movement_type = "In" if rng.random() < 0.4 else "Out"
+        quantity = rng.randrange(1, 6)
+        try:
+            post(movement(item_id, movement_type, quantity))
+        except app.PostingError:
+            rejected += 1
+            continue
+        except Exception:
+            errors += 1
+            continue
+        delta = quantity if movement_type == "In" else -quantity
+        posted[item_id] = posted.get(item_id, 0) + delta
+    results.put((posted, rejected, errors))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=300, help="movements posted by each process")
+    parser.add_argument("--items", type=int, default=3, help="hot items shared by all processes")
+    parser.add_argument("--stock", type=int, default=50, help="starting quantity of each item")
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["INVENTORY_DB_PATH"] = os.path.join(directory, "stress.db")
+        os.environ.setdefault("APPDATA", directory)
+        sys.path.insert(0, REPO)
+        import app
+        app.upgrade_database(app.engine)
+        with app.session_scope() as session:
+            for number in range(1, args.items + 1):
+                session.add(app.Item(id=number, name=f"Hot item {number}", serial_number=f"HOT{number}",
+                                     storage_location="Stores", quantity=args.stock))
+        app.engine.dispose()
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=poster, args=(worker, args, results))
+                     for worker in range(args.processes)]
+        started = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - started
+
+        expected = {number: args.stock for number in range(1, args.items + 1)}
+        for posted, _, _ in outcomes:
+            for item_id, delta in posted.items():
+                expected[item_id] += delta
+        with app.session_scope() as session:
+            actual = dict(session.query(app.Item.id, app.Item.quantity))
+            movements = session.query(app.StockMovement).count()
+        app.engine.dispose()
+
+    rejected = sum(outcome[1] for outcome in outcomes)
+    errors = sum(outcome[2] for outcome in outcomes)
+    total = args.processes * args.posts
+    print(f"{'legacy' if args.legacy else 'post_movement'}: {args.processes} processes x {args.posts} posts "
+          f"on {args.items} items in {elapsed:.2f}s ({total / elapsed:.0f} posts/s)")
+    print(f"posted {total - rejected - errors}, rejected for stock {rejected}, failed {errors}, "
+          f"movements recorded {movements}")
+    failures = 0
+    for item_id in sorted(expected):
+        ok = actual[item_id] == expected[item_id] and actual[item_id] >= 0
+        failures += not ok
+        print(f"item {item_id}: expected {expected[item_id]}, found {actual[item_id]}"
+              f"{'' if ok else '  <-- LOST UPDATE' if actual[item_id] >= 0 else '  <-- NEGATIVE'}")
+    if movements != total - rejected - errors:
+        failures += 1
+        print("movement count does not match the posts that succeeded")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()